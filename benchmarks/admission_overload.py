@@ -0,0 +1,88 @@
+"""Goodput past saturation: python -m benchmarks.admission_overload --db-url postgresql://...
+
+Drives GET /contacts/ at increasing concurrency for a fixed time per step while a separate
+client polls /healthcheck/ready, and reports goodput: responses that succeeded within --slo-ms.
+Run it once as is and once with --no-admission. Without admission control, goodput falls off
+and the probe's latency grows once concurrency passes the pool size. With admission control,
+excess requests get fast 503s, goodput holds and the probe stays fast. SQLite serializes writes
+and has no real pool, so use a Postgres --db-url for meaningful numbers.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from benchmarks.run import BENCH_PASSWORD, configure_environment, summarize
+
+async def drive(client, request: dict, concurrency: int, seconds: float, slo: float, pause: float = 0):
+    latencies, statuses, good = [], {}, 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal good
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.request(**request)
+            await response.aread()
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if response.status_code < 300 and elapsed <= slo:
+                good += 1
+            # In-process requests may complete without suspending; always yield so no loop starves the others
+            await asyncio.sleep(pause)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies, statuses, elapsed), "goodput_rps": round(good / elapsed, 2)}
+
+async def main(args):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.database import Base, SessionLocal, engine
+    from benchmarks.seed import seed
+
+    Base.metadata.create_all(bind=engine)
+    emails = seed(SessionLocal, 1, args.contacts, BENCH_PASSWORD)
+    async with app.router.lifespan_context(app):
+        # A pool timeout without admission control is a 500 to count, not a crash
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/auth/token", data={"username": emails[0], "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            listing = {"method": "GET", "url": "/contacts/", "headers": headers, "params": {"limit": 50}}
+            probe = {"method": "GET", "url": "/healthcheck/ready"}
+            print(f"admission {'on' if args.admission else 'off'}, {args.seconds}s per step, SLO {args.slo_ms} ms", file=sys.stderr)
+            for concurrency in args.concurrency:
+                load, probes = await asyncio.gather(
+                    drive(client, listing, concurrency, args.seconds, args.slo_ms / 1000),
+                    drive(client, probe, 1, args.seconds, args.slo_ms / 1000, pause=args.probe_interval),
+                )
+                print(
+                    f"concurrency {concurrency:>4}  goodput {load['goodput_rps']:>8.1f} rps  "
+                    f"p99 {load['p99_ms']:>9.2f} ms  {load['statuses']}  probe p99 {probes['p99_ms']:>8.2f} ms",
+                    file=sys.stderr,
+                )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--no-admission", dest="admission", action="store_false", help="Run with ADMISSION_ENABLED=false")
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 15, 30, 60, 120, 240])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--slo-ms", type=float, default=500)
+    parser.add_argument("--probe-interval", type=float, default=0.1, help="Seconds between readiness probes")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(args, workdir)
+        os.environ["ADMISSION_ENABLED"] = "true" if args.admission else "false"
+        asyncio.run(main(args))
@@ -0,0 +1,76 @@
+"""Concurrent avatar uploads: python -m benchmarks.avatar_uploads --uploads 100 --concurrency 20
+
+Uploads a --width x --height photo (JPEG) --uploads times at --concurrency through the local
+storage backend while a separate client polls GET /auth/me, then sends --oversized uploads of
+twice AVATAR_MAX_UPLOAD_BYTES. Reports upload throughput and latency, the probe's p99 (decoding
+and resizing run in the threadpool, so it should stay low), how fast oversized bodies are
+refused, and the process's peak RSS.
+"""
+import argparse
+import asyncio
+import io
+import resource
+import sys
+import tempfile
+import time
+from benchmarks.login_storm import poll, storm
+from benchmarks.run import BENCH_PASSWORD, configure_environment
+
+def photo(width: int, height: int) -> bytes:
+    from PIL import Image
+    # Noise compresses like a photo, unlike a flat color
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+async def main(args):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.config import settings
+    from src.database import Base, SessionLocal, engine
+    from benchmarks.seed import seed
+
+    Base.metadata.create_all(bind=engine)
+    emails = seed(SessionLocal, 1, 10, BENCH_PASSWORD)
+    data = photo(args.width, args.height)
+    oversized = b"\0" * (2 * settings.AVATAR_MAX_UPLOAD_BYTES)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/auth/token", data={"username": emails[0], "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            probe = {"method": "GET", "url": "/auth/me", "headers": headers}
+            upload = {"method": "POST", "url": "/auth/upload-avatar", "headers": headers, "files": {"file": ("photo.jpg", data, "image/jpeg")}}
+
+            done = asyncio.Event()
+            probe_task = asyncio.create_task(poll(client, probe, done))
+            uploads = await storm(client, upload, args.uploads, args.concurrency)
+            done.set()
+            probes = await probe_task
+            refused = await storm(client, {**upload, "files": {"file": ("huge.jpg", oversized, "image/jpeg")}}, args.oversized, args.concurrency)
+
+    print(f"{args.uploads} uploads of a {args.width}x{args.height} JPEG ({len(data) / 1024:.0f} KiB) at concurrency {args.concurrency}", file=sys.stderr)
+    print(f"uploads     {uploads['throughput_rps']:>8.1f} rps  p50 {uploads['p50_ms']:>8.2f}  p99 {uploads['p99_ms']:>8.2f} ms  {uploads['statuses']}", file=sys.stderr)
+    print(f"/auth/me    during the uploads p50 {probes['p50_ms']:>8.2f}  p99 {probes['p99_ms']:>8.2f} ms", file=sys.stderr)
+    print(f"oversized   p50 {refused['p50_ms']:>8.2f}  p99 {refused['p99_ms']:>8.2f} ms  {refused['statuses']}", file=sys.stderr)
+    print(f"peak RSS    {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--oversized", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--width", type=int, default=2400)
+    parser.add_argument("--height", type=int, default=1800)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(args, workdir)
+        asyncio.run(main(args))
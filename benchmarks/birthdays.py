@@ -0,0 +1,70 @@
+"""Upcoming birthdays on a large table: python -m benchmarks.birthdays --users 10 --contacts 100000
+
+Seeds --users users with --contacts contacts each (random birthdays), then times
+get_contacts_with_upcoming_birthdays for a few windows and prints the plan of each query: on
+SQLite its EXPLAIN QUERY PLAN, on Postgres (--db-url) EXPLAIN ANALYZE. The windowed queries
+should search ix_contacts_owner_birthday_key rather than scan the user's contacts.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.run import BENCH_PASSWORD, set_default_environment
+
+def capture_statements(engine) -> list:
+    """Starts recording (statement, parameters) of every query `engine` runs."""
+    from sqlalchemy import event
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters)))
+    return statements
+
+def explain(engine, statement: str, parameters) -> list:
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN ANALYZE "
+    with engine.connect() as connection:
+        return [" ".join(str(value) for value in row) for row in connection.exec_driver_sql(prefix + statement, parameters)]
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="contacts-birthdays-")
+    os.environ["DATABASE_URL"] = args.db_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    set_default_environment()
+
+    from benchmarks.seed import seed
+    from src.auth.models import User
+    from src.contacts import service
+    from src.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    seed(SessionLocal, args.users, args.contacts, BENCH_PASSWORD)
+    print(f"Seeded {args.users} x {args.contacts} contacts in {time.perf_counter() - start:.1f}s")
+    with engine.begin() as connection:
+        # Planner statistics, as a database that has been running a while would have
+        connection.exec_driver_sql("ANALYZE")
+
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).order_by(User.id).first().id
+        for days in args.days:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                contacts = service.get_contacts_with_upcoming_birthdays(db, user_id, days=days)
+                timings.append(time.perf_counter() - start)
+            statements = capture_statements(engine)
+            service.get_contacts_with_upcoming_birthdays(db, user_id, days=days)
+            statement, parameters = statements[-1]
+            print(f"days={days:<4} {len(contacts):>7} contacts  median {statistics.median(timings) * 1000:8.2f} ms")
+            for line in explain(engine, statement, parameters):
+                print(f"    {line}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=100_000, help="Contacts per user")
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
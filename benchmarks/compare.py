@@ -0,0 +1,28 @@
+"""Diff two benchmark result files: python -m benchmarks.compare BASELINE.json CANDIDATE.json"""
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+def change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def compare(baseline: dict, candidate: dict):
+    print(f"baseline:  {baseline['meta']['revision']} {baseline['meta']['label']}")
+    print(f"candidate: {candidate['meta']['revision']} {candidate['meta']['label']}")
+    print(f"{'scenario':36} " + "  ".join(f"{metric:>28}" for metric in METRICS))
+    for name, new in candidate["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:36} (new)")
+            continue
+        cells = [f"{old[m]:>8.2f} -> {new[m]:>8.2f} {change(old[m], new[m]):>7}" for m in METRICS]
+        print(f"{name:36} " + "  ".join(cells))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as old_file, open(sys.argv[2]) as new_file:
+        compare(json.load(old_file), json.load(new_file))
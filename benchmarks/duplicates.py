@@ -0,0 +1,91 @@
+"""Duplicate detection on a large book: python -m benchmarks.duplicates --contacts 100000
+
+Seeds one user with --contacts contacts, adds --duplicates near-copies of random ones, then times
+loading and clustering them. Each copy differs in a different way: an email with other case and a
++tag, a reformatted phone number, or a typo in the name with the same birthday. Also reports the
+share of copies found in the same cluster as their original.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from benchmarks.run import BENCH_PASSWORD, set_default_environment
+
+def with_typo(rng: random.Random, text: str) -> str:
+    if len(text) < 3:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+def make_copy(rng: random.Random, original, n: int) -> dict:
+    copy = {
+        "first_name": original.first_name,
+        "last_name": original.last_name,
+        "email": f"copy-{n}@example.org",
+        "phone": f"+1555{rng.randrange(10**7):07d}",
+        "birthday": original.birthday,
+        "additional_info": "imported",
+        "user_id": original.user_id,
+        "change_version": 1,
+    }
+    kind = n % 3
+    if kind == 0:
+        local, domain = original.email.split("@")
+        copy["email"] = f"{local.upper()}+import@{domain}"
+    elif kind == 1:
+        digits = original.phone.lstrip("+")
+        copy["phone"] = f"0{digits[-9:-7]} {digits[-7:-4]} {digits[-4:]}"
+        copy["first_name"] = original.first_name.upper()
+    else:
+        copy["last_name"] = with_typo(rng, original.last_name)
+    return copy
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="contacts-duplicates-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    set_default_environment()
+
+    from sqlalchemy import insert
+    from benchmarks.seed import seed
+    from src.database import Base, SessionLocal, engine
+    from src.contacts import models
+    from src.contacts.duplicates import cluster_duplicates, load_contacts
+
+    Base.metadata.create_all(bind=engine)
+    seed(SessionLocal, 1, args.contacts, BENCH_PASSWORD)
+    rng = random.Random(7)
+    db = SessionLocal()
+    try:
+        originals = rng.sample(db.query(*models.RESPONSE_COLUMNS).all(), args.duplicates)
+        copies = [
+            {**make_copy(rng, original, n), "birthday_key": models.get_birthday_key(original.birthday)}
+            for n, original in enumerate(originals)
+        ]
+        copy_ids = list(db.scalars(insert(models.Contact).returning(models.Contact.id, sort_by_parameter_order=True), copies))
+        db.commit()
+        user_id = originals[0].user_id
+
+        start = time.perf_counter()
+        result = cluster_duplicates(load_contacts(db, user_id))
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+
+    cluster_of = {}
+    for number, cluster in enumerate(result["clusters"]):
+        for contact_id in cluster["contact_ids"]:
+            cluster_of[contact_id] = number
+    found = sum(
+        1 for original, copy_id in zip(originals, copy_ids)
+        if original.id in cluster_of and cluster_of[original.id] == cluster_of.get(copy_id)
+    )
+    print(f"{result['scanned']} contacts scanned in {elapsed:.2f}s")
+    print(f"{len(result['clusters'])} clusters, {result['skipped_blocks']} oversized blocks skipped")
+    print(f"{found}/{len(copies)} injected copies clustered with their original ({found / len(copies):.1%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--duplicates", type=int, default=1000)
+    main(parser.parse_args())
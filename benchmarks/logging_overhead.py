@@ -0,0 +1,66 @@
+"""Per-call cost of logging on the request thread: python -m benchmarks.logging_overhead
+
+Compares the former setup (synchronous FileHandler and StreamHandler, f-string messages)
+with the queued JSON pipeline from src/logging_config.py, with and without sampling.
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+from benchmarks.run import set_default_environment
+
+def build_legacy_logger(directory: str) -> logging.Logger:
+    log = logging.getLogger("bench.legacy")
+    log.propagate = False
+    formatter = logging.Formatter("[%(levelname)s] %(asctime)s \"%(message)s\"", datefmt='%Y-%m-%d %H:%M:%S')
+    for handler in (logging.FileHandler(os.path.join(directory, "legacy.log")), logging.StreamHandler(open(os.devnull, "w"))):
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    return log
+
+def build_queued_logger(name: str, directory: str, sample_rate: float = None):
+    from src.logging_config import JsonFormatter, LazyQueueHandler, SamplingFilter
+    log = logging.getLogger(name)
+    log.propagate = False
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter({name: sample_rate} if sample_rate is not None else {}))
+    log.addHandler(queue_handler)
+    handlers = [logging.handlers.RotatingFileHandler(os.path.join(directory, f"{name}.log")), logging.StreamHandler(open(os.devnull, "w"))]
+    for handler in handlers:
+        handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return log, listener
+
+def measure(label: str, emit, calls: int, drain=None):
+    start = time.perf_counter()
+    for i in range(calls):
+        emit(i)
+    elapsed = time.perf_counter() - start
+    drained = time.perf_counter()
+    if drain:
+        drain()
+    drain_time = time.perf_counter() - drained
+    print(f"{label:28} {elapsed / calls * 1e6:8.2f} us/call on caller   (+{drain_time:.3f}s background drain)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+    set_default_environment()
+    with tempfile.TemporaryDirectory(prefix="bench-logging-") as directory:
+        legacy = build_legacy_logger(directory)
+        measure("sync handlers, f-string", lambda i: legacy.info(f"Retrieved {i} contacts for user: {7}"), args.calls)
+
+        queued, listener = build_queued_logger("bench.queued", directory)
+        measure("queue + JSON, lazy args", lambda i: queued.info("Retrieved %s contacts for user: %s", i, 7), args.calls, listener.stop)
+
+        sampled, listener = build_queued_logger("bench.sampled", directory, sample_rate=0.01)
+        measure("queue + JSON, 1% sampled", lambda i: sampled.info("Retrieved %s contacts for user: %s", i, 7), args.calls, listener.stop)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Login storm: python -m benchmarks.login_storm --logins 200 --concurrency 50
+
+Fires --logins POST /auth/token requests at --concurrency while a separate client polls the cheap
+GET /auth/me, and reports the p99 of both. bcrypt runs in the hashing process pool, so the storm
+should only slow logins down (or shed them with 503s past PASSWORD_HASH_QUEUE_SIZE) while the
+probe stays fast. Run it again with --rounds to see how the probe holds up as each hash gets dearer.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from benchmarks.run import BENCH_PASSWORD, configure_environment, summarize
+
+async def storm(client, request: dict, total: int, concurrency: int) -> dict:
+    latencies, statuses = [], {}
+    iterations = iter(range(total))
+
+    async def worker():
+        for _ in iterations:
+            start = time.perf_counter()
+            response = await client.request(**request)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+async def poll(client, request: dict, done: asyncio.Event) -> dict:
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    while not done.is_set():
+        request_start = time.perf_counter()
+        response = await client.request(**request)
+        await response.aread()
+        latencies.append(time.perf_counter() - request_start)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+async def main(args):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.database import Base, SessionLocal, engine
+    from benchmarks.seed import seed
+
+    Base.metadata.create_all(bind=engine)
+    emails = seed(SessionLocal, 1, 10, BENCH_PASSWORD)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            login = {"method": "POST", "url": "/auth/token", "data": {"username": emails[0], "password": BENCH_PASSWORD}}
+            response = await client.request(**login)
+            response.raise_for_status()
+            probe = {"method": "GET", "url": "/auth/me", "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+            idle = await storm(client, probe, 200, 1)
+
+            done = asyncio.Event()
+            probe_task = asyncio.create_task(poll(client, probe, done))
+            logins = await storm(client, login, args.logins, args.concurrency)
+            done.set()
+            probes = await probe_task
+
+    print(
+        f"bcrypt rounds {args.rounds}, {os.environ['PASSWORD_HASH_WORKERS']} hash workers, "
+        f"{args.logins} logins at concurrency {args.concurrency}",
+        file=sys.stderr,
+    )
+    print(f"logins      {logins['throughput_rps']:>8.1f} rps  p50 {logins['p50_ms']:>9.2f}  p99 {logins['p99_ms']:>9.2f} ms  {logins['statuses']}", file=sys.stderr)
+    print(f"/auth/me    idle p99 {idle['p99_ms']:>8.2f} ms  during the storm p50 {probes['p50_ms']:>8.2f}  p99 {probes['p99_ms']:>8.2f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS, defaults to the setting")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(args, workdir)
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        if args.workers:
+            os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+        os.environ.setdefault("PASSWORD_HASH_WORKERS", "2")
+        asyncio.run(main(args))
@@ -0,0 +1,69 @@
+"""Offset vs cursor paging by depth: python -m benchmarks.pagination --contacts 100000
+
+Seeds one user with --contacts contacts and reads GET /contacts/ pages of --limit at increasing
+depths, once with `skip` and once with the `after` cursor that starts at the same row. Requests
+are sequential so the numbers are per-page latency, not contention. Offset pages slow down with
+depth as the database walks past the skipped rows; cursor pages should cost the same at any depth.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from benchmarks.run import BENCH_PASSWORD, configure_environment
+
+async def median_ms(client, request: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.request(**request)
+        response.raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+async def main(args):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.auth.models import User
+    from src.database import Base, SessionLocal, engine
+    from benchmarks.scenarios import keyset_cursor
+    from benchmarks.seed import seed
+
+    Base.metadata.create_all(bind=engine)
+    emails = seed(SessionLocal, 1, args.contacts, BENCH_PASSWORD)
+    last_page = max((args.contacts - 1) // args.limit + 1, 1)
+    pages = sorted({page for page in (1, 10, 100, 1000, last_page) if page <= last_page})
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.email == emails[0]).scalar()
+        cursors = {page: keyset_cursor(db, user_id, (page - 1) * args.limit) for page in pages}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/auth/token", data={"username": emails[0], "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            print(f"{args.contacts} contacts, {args.limit} per page, median of {args.repeat} requests")
+            print(f"{'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+            for page in pages:
+                offset = {"skip": (page - 1) * args.limit, "limit": args.limit}
+                cursor = {"limit": args.limit, **({"after": cursors[page]} if cursors[page] else {})}
+                offset_ms = await median_ms(client, {"method": "GET", "url": "/contacts/", "headers": headers, "params": offset}, args.repeat)
+                cursor_ms = await median_ms(client, {"method": "GET", "url": "/contacts/", "headers": headers, "params": cursor}, args.repeat)
+                print(f"{page:>6} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(args, workdir)
+        asyncio.run(main(args))
@@ -0,0 +1,44 @@
+"""Added latency of a rate limit check: python -m benchmarks.rate_limit_overhead
+
+Measures RateLimiter.hit() against fakeredis (or --redis-url) for a loose limit that is mostly
+decided locally, a tight limit that syncs with Redis on every call, and local-only mode.
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.run import set_default_environment
+
+async def measure(label: str, limiter, rule: str, calls: int, identities: int = None):
+    start = time.perf_counter()
+    for i in range(calls):
+        try:
+            await limiter.hit(rule, f"user:{i % identities if identities else i}")
+        except Exception:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{label:32} {elapsed / calls * 1e6:8.2f} us/check")
+
+async def main(args):
+    from src.utils import redis_client
+    if args.redis_url:
+        from redis import asyncio as aioredis
+        redis_client.redis_client = aioredis.from_url(args.redis_url, decode_responses=True)
+    else:
+        from fakeredis import aioredis as fake_aioredis
+        redis_client.redis_client = fake_aioredis.FakeRedis(decode_responses=True)
+    from src.utils.rate_limit import RateLimiter
+
+    limiter = RateLimiter({"loose": "1000000/60", "tight": "5/60"})
+    # 100 recurring users: after their first hit, checks are local until the next periodic sync
+    await measure("loose limit (local buckets)", limiter, "loose", args.calls, identities=100)
+    # A fresh identity per call keeps every check under the limit, so each one syncs with Redis
+    await measure("tight limit (Redis every hit)", limiter, "tight", args.calls)
+    limiter.degraded_until = float("inf")
+    await measure("local-only mode", limiter, "tight", args.calls)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--redis-url", help="Measure against a real Redis instead of fakeredis")
+    set_default_environment()
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""Registration latency with and without the outbox: python -m benchmarks.registration_latency [--no-outbox]
+
+Runs a local SMTP server (aiosmtpd) that takes --smtp-delay-ms per message, like a remote relay,
+and drives POST /auth/register. With the outbox the email is only written to the email_outbox
+table and the dispatcher delivers it in the background; without it, each request waits for the
+SMTP round trip. Also reports how long the last email took to arrive after the last response.
+bcrypt defaults to its minimum cost here so the email path dominates.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from benchmarks.run import configure_environment, summarize
+
+class SlowInbox:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.last_received_at = 0.0
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last_received_at = time.perf_counter()
+        return "250 OK"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def main(args, inbox):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    latencies, statuses = [], {}
+    emails = iter(range(args.registrations))
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def worker():
+                for n in emails:
+                    start = time.perf_counter()
+                    response = await client.post("/auth/register", json={"email": f"register-{n}@example.com", "password": "bench-password"})
+                    latencies.append(time.perf_counter() - start)
+                    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            finished = time.perf_counter()
+            summary = summarize(latencies, statuses, finished - start)
+            deadline = finished + args.registrations * args.smtp_delay_ms / 1000 + 30
+            while inbox.received < args.registrations and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+
+    delivered = max(inbox.last_received_at - finished, 0.0) * 1000
+    print(f"outbox {'on' if args.outbox else 'off'}, SMTP delay {args.smtp_delay_ms} ms, "
+          f"{args.registrations} registrations at concurrency {args.concurrency}", file=sys.stderr)
+    print(f"POST /auth/register  {summary['throughput_rps']:>8.1f} rps  p50 {summary['p50_ms']:>8.2f}  "
+          f"p99 {summary['p99_ms']:>8.2f} ms  {summary['statuses']}", file=sys.stderr)
+    print(f"emails delivered {inbox.received}/{args.registrations}, last one {delivered:.0f} ms after the last response", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--no-outbox", dest="outbox", action="store_false", help="Run with OUTBOX_ENABLED=false")
+    parser.add_argument("--registrations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--smtp-delay-ms", type=float, default=100)
+    parser.add_argument("--rounds", type=int, default=4, help="BCRYPT_ROUNDS")
+    args = parser.parse_args()
+
+    from aiosmtpd.controller import Controller
+    inbox = SlowInbox(args.smtp_delay_ms / 1000)
+    controller = Controller(inbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            configure_environment(args, workdir)
+            os.environ.update({
+                "OUTBOX_ENABLED": "true" if args.outbox else "false",
+                "OUTBOX_POLL_INTERVAL_SECONDS": "0.1",
+                "SMTP_SERVER": "127.0.0.1", "SMTP_PORT": str(controller.port), "SMTP_STARTTLS": "false",
+                "SMTP_USERNAME": "", "BCRYPT_ROUNDS": str(args.rounds),
+            })
+            asyncio.run(main(args, inbox))
+    finally:
+        controller.stop()
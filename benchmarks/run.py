@@ -0,0 +1,185 @@
+"""Load test every route of the app in-process.
+
+    python -m benchmarks.run --contacts 10000 --requests 500 --concurrency 50
+    python -m benchmarks.compare benchmarks/results/a.json benchmarks/results/b.json
+
+The app is imported with a throwaway SQLite database (or --db-url, e.g. a local Postgres)
+and fakeredis, seeded, then driven through httpx's ASGI transport. Results are written as
+JSON with per-endpoint throughput and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_PASSWORD = "bench-password"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="Database to run against, defaults to a temporary SQLite file")
+    parser.add_argument("--async-db", action="store_true", help="Run with DATABASE_ASYNC=true")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--contacts", type=int, default=1000, help="Contacts seeded per user")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenario", action="append", default=[], help="Only run scenarios containing this text")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Result file, defaults to benchmarks/results/<timestamp>.json")
+    return parser.parse_args(argv)
+
+def set_default_environment():
+    """Placeholder values for the settings that have no default, unless already set."""
+    for name, value in {
+        "SECRET_KEY": "bench-secret", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "SECURITY_PASSWORD_SALT": "bench-salt", "EMAIL_FROM": "bench@example.com",
+        "SMTP_SERVER": "localhost", "SMTP_PORT": "8025", "SMTP_USERNAME": "", "SMTP_PASSWORD": "",
+        "SMTP_STARTTLS": "false", "CLOUDINARY_CLOUD_NAME": "bench", "CLOUDINARY_API_KEY": "bench",
+        "CLOUDINARY_API_SECRET": "bench",
+    }.items():
+        os.environ.setdefault(name, value)
+
+def configure_environment(args, workdir: str):
+    """Settings are read at import time, so this has to run before anything from src is imported."""
+    db_url = args.db_url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ.update({
+        "DATABASE_URL": db_url,
+        "DATABASE_ASYNC": "true" if args.async_db else "false",
+        "AVATAR_STORAGE_BACKEND": "local",
+        "AVATAR_LOCAL_DIR": os.path.join(workdir, "avatars"),
+        "OUTBOX_POLL_INTERVAL_SECONDS": "3600",
+        # Scenarios measure the handlers; shedding under overload is measured by admission_overload.py
+        "ADMISSION_ENABLED": "false",
+        # Limits high enough never to trigger, so the limiter's cost is measured without its 429s
+        "RATE_LIMITS": json.dumps({name: "1000000000/60" for name in (
+            "contacts:create", "contacts:import", "contacts:batch", "contacts:duplicates", "auth:token:ip", "auth:token:email",
+        )}),
+    })
+    set_default_environment()
+    return db_url
+
+def percentile(quantiles: list, p: int) -> float:
+    return quantiles[p - 1] if quantiles else 0.0
+
+def summarize(latencies: list, statuses: dict, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    quantiles = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(quantiles, 50) * 1000, 3),
+        "p95_ms": round(percentile(quantiles, 95) * 1000, 3),
+        "p99_ms": round(percentile(quantiles, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "statuses": statuses,
+    }
+
+async def run_scenario(client, scenario, total: int, concurrency: int) -> dict:
+    total = min(total, scenario.max_requests) if scenario.max_requests is not None else total
+    latencies, statuses = [], {}
+    iterations = iter(range(total))
+
+    async def worker():
+        for i in iterations:
+            kwargs = scenario.request(i)
+            start = time.perf_counter()
+            response = await client.request(**kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def main(args):
+    import httpx
+    from fakeredis import aioredis as fake_aioredis
+    from src.utils import redis_client
+    redis_client.redis_client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    from src.main import app
+    from src.database import Base, SessionLocal, engine
+    from src.auth.utils import generate_email_verification_token
+    from benchmarks.seed import seed
+    from benchmarks.scenarios import BenchContext, build_scenarios, keyset_cursor
+
+    # A throwaway database, so the schema comes straight from the models instead of migrations
+    Base.metadata.create_all(bind=engine)
+    print(f"Seeding {args.users} user(s) x {args.contacts} contacts...", file=sys.stderr)
+    seed_start = time.perf_counter()
+    emails = seed(SessionLocal, args.users, args.contacts, BENCH_PASSWORD)
+    seed_seconds = time.perf_counter() - seed_start
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        # An unhandled error is a 500 to the client, as behind a server, instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/auth/token", data={"username": emails[0], "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            token = response.json()["access_token"]
+            db = SessionLocal()
+            try:
+                from src.contacts.models import Contact
+                from src.auth.models import User
+                user = db.query(User).filter(User.email == emails[0]).one()
+                contact_ids = [row.id for row in db.query(Contact.id).filter(Contact.user_id == user.id).order_by(Contact.id)]
+                deep_cursor = keyset_cursor(db, user.id, max(len(contact_ids) - 50, 0))
+            finally:
+                db.close()
+            ctx = BenchContext(emails[0], BENCH_PASSWORD, token, contact_ids, deep_cursor)
+            for scenario in build_scenarios(ctx, generate_email_verification_token):
+                if args.scenario and not any(text in scenario.name for text in args.scenario):
+                    continue
+                results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+                summary = results[scenario.name]
+                print(
+                    f"{scenario.name:36} {summary['throughput_rps']:>9.1f} rps  "
+                    f"p50 {summary['p50_ms']:>8.2f}  p95 {summary['p95_ms']:>8.2f}  p99 {summary['p99_ms']:>8.2f} ms  "
+                    f"{summary['statuses']}",
+                    file=sys.stderr,
+                )
+    return seed_seconds, results
+
+def run(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        db_url = configure_environment(args, workdir)
+        seed_seconds, results = asyncio.run(main(args))
+    report = {
+        "meta": {
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": db_url.split("://")[0],
+            "async_db": args.async_db,
+            "users": args.users,
+            "contacts_per_user": args.contacts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,147 @@
+import io
+import itertools
+from dataclasses import dataclass
+from typing import Callable
+from src.contacts.pagination import encode_cursor
+
+@dataclass
+class Scenario:
+    """One endpoint under load; `request` builds the client.request() kwargs for iteration i."""
+    name: str
+    request: Callable
+    # Scenarios that consume state (e.g. deleting contacts) cap their own request count
+    max_requests: int = None
+
+class BenchContext:
+    """State shared by the scenarios: a logged in user and some of their contact ids."""
+
+    def __init__(self, email: str, password: str, token: str, contact_ids: list, deep_cursor: str = None):
+        self.email = email
+        self.password = password
+        self.token = token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.contact_ids = contact_ids
+        self.counter = itertools.count()
+        self.deletable_ids = iter(contact_ids[len(contact_ids) // 2:])
+        # Token of a sync that has seen every seeded contact, which are all at version 1
+        self.sync_token = encode_cursor(1, None)
+        # `after` cursor of the page the deep offset scenario reads, see keyset_cursor
+        self.deep_cursor = deep_cursor
+
+    def contact_id(self, i: int) -> int:
+        return self.contact_ids[i % (len(self.contact_ids) // 2 or 1)]
+
+def keyset_cursor(db, user_id: int, skip: int):
+    """The `after` cursor of GET /contacts/ that starts at the same row as `skip`, or None for the first page."""
+    from src.contacts.models import Contact
+    if skip <= 0:
+        return None
+    row = db.query(Contact.last_name, Contact.id).filter(Contact.user_id == user_id).order_by(
+        Contact.last_name, Contact.id
+    ).offset(skip - 1).limit(1).one()
+    return encode_cursor(row.last_name, row.id)
+
+def contact_payload(n: int) -> dict:
+    return {
+        "first_name": "Bench",
+        "last_name": f"Contact{n}",
+        "email": f"bench-created-{n}@example.com",
+        "phone": "+380000000000",
+        "birthday": "1990-01-01",
+    }
+
+def png_avatar() -> bytes:
+    from PIL import Image
+    output = io.BytesIO()
+    Image.new("RGB", (512, 512), (120, 80, 200)).save(output, format="PNG")
+    return output.getvalue()
+
+def import_body(ctx: BenchContext, rows: int = 100) -> bytes:
+    lines = ["first_name,last_name,email,phone,birthday"]
+    for _ in range(rows):
+        n = next(ctx.counter)
+        lines.append(f"Bench,Import{n},bench-import-{n}@example.com,+380000000000,1991-02-03")
+    return "\n".join(lines).encode()
+
+def build_scenarios(ctx: BenchContext, verification_token: Callable[[str], str]) -> list:
+    avatar = png_avatar()
+    auth = ctx.headers
+    return [
+        # healthcheck
+        Scenario("GET /healthcheck/", lambda i: {"method": "GET", "url": "/healthcheck/"}),
+        Scenario("GET /healthcheck/live", lambda i: {"method": "GET", "url": "/healthcheck/live"}),
+        Scenario("GET /healthcheck/ready", lambda i: {"method": "GET", "url": "/healthcheck/ready"}),
+        Scenario("GET /healthcheck/pool", lambda i: {"method": "GET", "url": "/healthcheck/pool"}),
+        Scenario("GET /healthcheck/user-cache", lambda i: {"method": "GET", "url": "/healthcheck/user-cache"}),
+        # auth
+        Scenario("POST /auth/register", lambda i: {
+            "method": "POST", "url": "/auth/register",
+            "json": {"email": f"bench-register-{next(ctx.counter)}@example.com", "password": "bench-password"},
+        }),
+        Scenario("POST /auth/token", lambda i: {
+            "method": "POST", "url": "/auth/token", "data": {"username": ctx.email, "password": ctx.password},
+        }),
+        Scenario("GET /auth/verify/{token}", lambda i: {
+            "method": "GET", "url": f"/auth/verify/{verification_token(ctx.email)}",
+        }),
+        Scenario("GET /auth/me", lambda i: {"method": "GET", "url": "/auth/me", "headers": auth}),
+        Scenario("POST /auth/upload-avatar", lambda i: {
+            "method": "POST", "url": "/auth/upload-avatar", "headers": auth,
+            "files": {"file": ("avatar.png", avatar, "image/png")},
+        }),
+        # contacts; the sync scenarios run first, before any write moves the user's version on
+        Scenario("GET /contacts/changes", lambda i: {
+            "method": "GET", "url": "/contacts/changes", "headers": auth, "params": {"limit": 500},
+        }),
+        Scenario("GET /contacts/changes no-change sync", lambda i: {
+            "method": "GET", "url": "/contacts/changes", "headers": auth, "params": {"since": ctx.sync_token},
+        }),
+        Scenario("POST /contacts/", lambda i: {
+            "method": "POST", "url": "/contacts/", "headers": auth, "json": contact_payload(next(ctx.counter)),
+        }),
+        Scenario("GET /contacts/", lambda i: {"method": "GET", "url": "/contacts/", "headers": auth, "params": {"limit": 50}}),
+        Scenario("GET /contacts/ large page", lambda i: {"method": "GET", "url": "/contacts/", "headers": auth, "params": {"limit": 1000}}),
+        Scenario("GET /contacts/ deep offset", lambda i: {
+            "method": "GET", "url": "/contacts/", "headers": auth,
+            "params": {"limit": 50, "skip": max(len(ctx.contact_ids) - 50, 0)},
+        }),
+        # The same page as deep offset, reached with the keyset cursor instead
+        Scenario("GET /contacts/ deep cursor", lambda i: {
+            "method": "GET", "url": "/contacts/", "headers": auth,
+            "params": {"limit": 50, **({"after": ctx.deep_cursor} if ctx.deep_cursor else {})},
+        }),
+        Scenario("GET /contacts/{id}", lambda i: {"method": "GET", "url": f"/contacts/{ctx.contact_id(i)}", "headers": auth}),
+        Scenario("PUT /contacts/{id}", lambda i: {
+            "method": "PUT", "url": f"/contacts/{ctx.contact_id(i)}", "headers": auth,
+            "json": contact_payload(f"updated-{ctx.contact_id(i)}"),
+        }),
+        Scenario("PATCH /contacts/{id}", lambda i: {
+            "method": "PATCH", "url": f"/contacts/{ctx.contact_id(i)}", "headers": auth, "json": {"phone": f"+380{i:09d}"},
+        }),
+        Scenario("DELETE /contacts/{id}", lambda i: {
+            "method": "DELETE", "url": f"/contacts/{next(ctx.deletable_ids)}", "headers": auth,
+        }, max_requests=len(ctx.contact_ids) // 2),
+        Scenario("GET /contacts/search/", lambda i: {
+            "method": "GET", "url": "/contacts/search/", "headers": auth, "params": {"name": "enko"},
+        }),
+        Scenario("GET /contacts/birthdays/", lambda i: {
+            "method": "GET", "url": "/contacts/birthdays/", "headers": auth, "params": {"days": 7},
+        }),
+        Scenario("GET /contacts/birthdays/ whole year", lambda i: {
+            "method": "GET", "url": "/contacts/birthdays/", "headers": auth, "params": {"days": 366},
+        }),
+        Scenario("GET /contacts/duplicates", lambda i: {"method": "GET", "url": "/contacts/duplicates", "headers": auth}),
+        Scenario("POST /contacts/batch", lambda i: {
+            "method": "POST", "url": "/contacts/batch", "headers": auth,
+            "json": {"operations": [{"op": "create", "contact": contact_payload(next(ctx.counter))} for _ in range(50)]},
+        }),
+        Scenario("POST /contacts/import", lambda i: {
+            "method": "POST", "url": "/contacts/import", "headers": {**auth, "Content-Type": "text/csv"},
+            "params": {"format": "csv"}, "content": import_body(ctx),
+        }),
+        Scenario("GET /contacts/export", lambda i: {
+            "method": "GET", "url": "/contacts/export", "headers": auth, "params": {"format": "ndjson"},
+        }),
+        # metrics
+        Scenario("GET /metrics", lambda i: {"method": "GET", "url": "/metrics"}),
+    ]
@@ -0,0 +1,48 @@
+import random
+from datetime import date, timedelta
+from sqlalchemy import insert
+
+FIRST_NAMES = ["Anna", "Oleh", "Maria", "Ivan", "Olena", "Taras", "Sofia", "Andrii", "Iryna", "Dmytro", "Kateryna", "Petro"]
+LAST_NAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Koval", "Oliinyk", "Lysenko"]
+
+def seed(session_factory, users: int, contacts_per_user: int, password: str, seed_value: int = 13, batch_size: int = 5000):
+    """Create `users` verified users with `contacts_per_user` contacts each; returns their emails."""
+    from src.auth.models import User
+    from src.auth.utils import get_password_hash
+    from src.contacts.models import Contact, get_birthday_key
+
+    rng = random.Random(seed_value)
+    hashed_password = get_password_hash(password)
+    emails = [f"bench-user-{n}@example.com" for n in range(users)]
+    db = session_factory()
+    try:
+        db.execute(insert(User), [
+            {"email": email, "username": email.split("@")[0], "hashed_password": hashed_password, "is_verified": True, "contacts_version": 1}
+            for email in emails
+        ])
+        db.commit()
+        user_ids = [user.id for user in db.query(User.id).filter(User.email.in_(emails)).order_by(User.id)]
+        for user_id in user_ids:
+            rows = []
+            for i in range(contacts_per_user):
+                birthday = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55))
+                rows.append({
+                    "first_name": rng.choice(FIRST_NAMES),
+                    "last_name": rng.choice(LAST_NAMES),
+                    "email": f"contact-{user_id}-{i}@example.com",
+                    "phone": f"+380{rng.randrange(10**9):09d}",
+                    "birthday": birthday,
+                    "birthday_key": get_birthday_key(birthday),
+                    "additional_info": None,
+                    "user_id": user_id,
+                    "change_version": 1,
+                })
+                if len(rows) >= batch_size:
+                    db.execute(insert(Contact), rows)
+                    rows = []
+            if rows:
+                db.execute(insert(Contact), rows)
+            db.commit()
+    finally:
+        db.close()
+    return emails
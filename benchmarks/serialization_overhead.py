@@ -0,0 +1,64 @@
+"""Cost of building a page of contacts: python -m benchmarks.serialization_overhead
+
+Compares the former read path (ORM entities, FastAPI's response_model validation and
+jsonable_encoder) with the column projection in src/contacts: Core rows with only the
+response columns, validated by a precompiled TypeAdapter and encoded with orjson.
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.run import set_default_environment
+
+def measure(label: str, fn, rounds: int):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:36} {elapsed / rounds * 1000:8.3f} ms/page")
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="contacts-serialization-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    set_default_environment()
+
+    import json
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from benchmarks.seed import seed
+    from src.database import Base, SessionLocal, engine
+    from src.contacts import models, schemas, serializers
+
+    Base.metadata.create_all(bind=engine)
+    seed(SessionLocal, 1, args.page_size, "bench-password")
+    db = SessionLocal()
+
+    def entities():
+        db.expunge_all()
+        return db.query(models.Contact).order_by(models.Contact.last_name, models.Contact.id).limit(args.page_size).all()
+
+    def rows():
+        return db.query(*models.RESPONSE_COLUMNS).order_by(models.Contact.last_name, models.Contact.id).limit(args.page_size).all()
+
+    def legacy():
+        # What FastAPI does for response_model=List[schemas.Contact] on a list of entities
+        validated = TypeAdapter(List[schemas.Contact]).validate_python(entities(), from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def projected():
+        return serializers.dump_contact_rows(rows())
+
+    print(f"{args.page_size} contacts per page, {args.rounds} rounds")
+    measure("load entities", entities, args.rounds)
+    measure("load projected rows", rows, args.rounds)
+    measure("entities + response_model", legacy, args.rounds)
+    measure("rows + TypeAdapter + orjson", projected, args.rounds)
+    db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,51 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Existing databases created before migrations were introduced already have it:
+run `alembic stamp 0001` once, then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('avatar_url', sa.String(), nullable=True),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'contacts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('first_name', sa.String(), nullable=True),
+        sa.Column('last_name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('birthday', sa.Date(), nullable=True),
+        sa.Column('additional_info', sa.String(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+    )
+    op.create_index('ix_contacts_id', 'contacts', ['id'])
+    op.create_index('ix_contacts_first_name', 'contacts', ['first_name'])
+    op.create_index('ix_contacts_last_name', 'contacts', ['last_name'])
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True)
+
+
+def downgrade():
+    op.drop_table('contacts')
+    op.drop_table('users')
@@ -0,0 +1,62 @@
+"""Contacts pagination/search/birthday indexes and the email outbox
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column('contacts', sa.Column('birthday_key', sa.Integer(), nullable=True))
+    if is_postgres:
+        op.execute("UPDATE contacts SET birthday_key = EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday)")
+    else:
+        op.execute("UPDATE contacts SET birthday_key = CAST(strftime('%m%d', birthday) AS INTEGER)")
+    op.create_index('ix_contacts_owner_last_name_id', 'contacts', ['owner_id', 'last_name', 'id'])
+    op.create_index('ix_contacts_owner_birthday_key', 'contacts', ['owner_id', 'birthday_key'])
+
+    if is_postgres:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in ('first_name', 'last_name', 'email'):
+            op.create_index(
+                f'ix_contacts_{column}_trgm', 'contacts', [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+            )
+
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dedup_key', sa.String(), nullable=False, unique=True),
+        sa.Column('to_email', sa.String(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_email_outbox_id', 'email_outbox', ['id'])
+    op.create_index('ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_table('email_outbox')
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in ('first_name', 'last_name', 'email'):
+            op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_owner_birthday_key', table_name='contacts')
+    op.drop_index('ix_contacts_owner_last_name_id', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('birthday_key')
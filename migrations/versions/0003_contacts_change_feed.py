@@ -0,0 +1,52 @@
+"""Contacts change feed: per-user versions, updated_at and delete tombstones
+
+Existing contacts and users start at version 1, so a first sync returns every contact.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('contacts_version', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("UPDATE users SET contacts_version = 1")
+
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('change_version', sa.Integer(), nullable=True))
+    op.execute("UPDATE contacts SET updated_at = CURRENT_TIMESTAMP, change_version = 1")
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('updated_at', nullable=False)
+        batch_op.alter_column('change_version', nullable=False)
+    op.create_index('ix_contacts_owner_change_version_id', 'contacts', ['owner_id', 'change_version', 'id'])
+
+    op.create_table(
+        'contact_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('change_version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_contact_tombstones_owner_change_version_contact_id', 'contact_tombstones',
+        ['owner_id', 'change_version', 'contact_id'],
+    )
+
+
+def downgrade():
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_owner_change_version_id', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('change_version')
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('contacts_version')
@@ -0,0 +1,27 @@
+"""Make contacts.last_name NOT NULL
+
+Keyset pagination compares (last_name, id) tuples, which skips rows with a NULL last_name.
+The API always required a last name, so existing NULLs are backfilled with an empty string.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE contacts SET last_name = '' WHERE last_name IS NULL")
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('last_name', existing_type=sa.String(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.alter_column('last_name', existing_type=sa.String(), nullable=True)
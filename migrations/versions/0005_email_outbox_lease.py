@@ -0,0 +1,28 @@
+"""Email outbox leases
+
+Dispatchers lease messages (status 'sending' until leased_until) and commit before talking to
+SMTP, instead of holding row locks for the whole batch.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('email_outbox', sa.Column('leased_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_email_outbox_status_leased_until', 'email_outbox', ['status', 'leased_until'])
+
+
+def downgrade():
+    op.execute("UPDATE email_outbox SET status = 'pending' WHERE status = 'sending'")
+    op.drop_index('ix_email_outbox_status_leased_until', table_name='email_outbox')
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.drop_column('leased_until')
@@ -0,0 +1,27 @@
+"""Contact tombstone retention
+
+Tombstones older than TOMBSTONE_RETENTION_DAYS are pruned by `python -m src.contacts.changes`,
+which records the highest pruned version per user so that older sync tokens can be refused.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('contacts_pruned_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_contact_tombstones_deleted_at', 'contact_tombstones', ['deleted_at'])
+
+
+def downgrade():
+    op.drop_index('ix_contact_tombstones_deleted_at', table_name='contact_tombstones')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('contacts_pruned_version')
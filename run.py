@@ -1,8 +1,74 @@
+import argparse
+import importlib.util
 import sys
 import os
 import uvicorn
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from src.config import settings
+from src.logging_config import logger
+
+def get_worker_count(requested: int = 0) -> int:
+    return requested or settings.SERVER_WORKERS or os.cpu_count() or 1
+
+def get_worker_pool(workers: int) -> tuple:
+    """(pool size, max overflow) per engine so that all workers together stay within DB_CONNECTION_BUDGET."""
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if not settings.DB_CONNECTION_BUDGET:
+        return pool_size, max_overflow
+    # In async mode every worker also keeps the sync engine, used by the outbox dispatcher
+    engines = 2 if settings.DATABASE_ASYNC else 1
+    per_engine = settings.DB_CONNECTION_BUDGET // (workers * engines)
+    if per_engine < 1:
+        raise SystemExit(f"DB_CONNECTION_BUDGET={settings.DB_CONNECTION_BUDGET} is too small for {workers} workers")
+    if pool_size + max_overflow <= per_engine:
+        return pool_size, max_overflow
+    pool_size = min(pool_size, per_engine)
+    return pool_size, per_engine - pool_size
+
+def get_worker_hash_pool(workers: int) -> int:
+    """bcrypt processes per worker, so that all workers' pools together don't oversubscribe the cores."""
+    return max(1, min(settings.PASSWORD_HASH_WORKERS, (os.cpu_count() or 1) // workers))
+
+def run_production(workers: int):
+    pool_size, max_overflow = get_worker_pool(workers)
+    hash_workers = get_worker_hash_pool(workers)
+    # Workers are spawned processes reading their settings from the environment
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(hash_workers)
+    os.environ["LOG_FILES_PER_PROCESS"] = "true"
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(
+        "Starting %s workers (%s, %s), pool %s+%s per worker, at most %s connections per engine, "
+        "%s bcrypt processes per worker",
+        workers, loop, http, pool_size, max_overflow, workers * (pool_size + max_overflow), hash_workers,
+    )
+    # SIGHUP restarts the workers one by one, SIGTERM drains them within the graceful timeout
+    uvicorn.run(
+        "src.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        limit_max_requests_jitter=settings.SERVER_MAX_REQUESTS_JITTER,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+    )
+
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8888, reload=True)
+    parser = argparse.ArgumentParser(description="Run the API: a reloading development server, or --prod for multiple workers")
+    parser.add_argument("--prod", action="store_true", help="Production mode, tuned by the SERVER_* settings")
+    parser.add_argument("--workers", type=int, default=0, help="Overrides SERVER_WORKERS in production mode")
+    args = parser.parse_args()
+    if args.prod:
+        run_production(get_worker_count(args.workers))
+    else:
+        uvicorn.run("src.main:app", host="0.0.0.0", port=8888, reload=True)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from redis.exceptions import WatchError
+from src.auth import models
+from src.config import settings
+from src.logging_config import logger
+from src.utils.redis_client import get_redis
+
+# Columns kept in the cache; the password hash never leaves the database
+CACHED_FIELDS = ("id", "email", "username", "is_verified", "avatar_url")
+# Emails of invalidated users are published here so every worker drops its local copy
+INVALIDATION_CHANNEL = "user-cache:invalidate"
+
+class UserCache:
+    """Two-tier cache of authenticated users keyed by email.
+
+    The first tier is a per-process LRU with a short TTL, the second one is Redis,
+    shared by all workers. Invalidations are broadcast over Redis pub/sub and applied by
+    each worker's listener; while a listener is disconnected it may miss them, so it clears
+    its whole local tier on reconnect, leaving the local TTL as the bound on staleness.
+    A user loaded from the database is cached only if nothing invalidated it since the
+    load started: take `generation(email)` before loading and pass it to `set`.
+    Cached users are returned as detached User instances, so anything that writes to the
+    user row must load it from the session first.
+    """
+
+    def __init__(self, max_size: int, local_ttl: int, redis_ttl: int):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local = OrderedDict()
+        self._listener = None
+        # Bumped on every local or remote invalidation, so a racing local set can tell
+        self._local_generation = 0
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0, "remote_invalidations": 0, "discarded_sets": 0}
+
+    @staticmethod
+    def _redis_key(email: str) -> str:
+        return f"user:{email}"
+
+    @staticmethod
+    def _generation_key(email: str) -> str:
+        return f"user-generation:{email}"
+
+    def _drop_local(self, email: str = None):
+        self._local_generation += 1
+        if email is None:
+            self._local.clear()
+        else:
+            self._local.pop(email, None)
+
+    def _get_local(self, email: str):
+        entry = self._local.get(email)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._local[email]
+            return None
+        self._local.move_to_end(email)
+        return data
+
+    def _set_local(self, email: str, data: dict):
+        self._local[email] = (time.monotonic() + self.local_ttl, data)
+        self._local.move_to_end(email)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def get(self, email: str):
+        data = self._get_local(email)
+        if data is not None:
+            self.stats["local_hits"] += 1
+            return models.User(**data)
+        try:
+            raw = await get_redis().get(self._redis_key(email))
+        except Exception as e:
+            logger.warning("User cache Redis lookup failed: %s", e)
+            raw = None
+        if raw is not None:
+            self.stats["redis_hits"] += 1
+            data = json.loads(raw)
+            self._set_local(email, data)
+            return models.User(**data)
+        self.stats["misses"] += 1
+        return None
+
+    async def generation(self, email: str) -> tuple:
+        """Token to pass to `set` for a user loaded from the database after this call."""
+        try:
+            redis_generation = int(await get_redis().get(self._generation_key(email)) or 0)
+        except Exception as e:
+            logger.warning("User cache Redis generation lookup failed: %s", e)
+            redis_generation = None
+        return self._local_generation, redis_generation
+
+    async def set(self, user: models.User, generation: tuple):
+        """Caches `user` unless it was invalidated since `generation` was taken."""
+        local_generation, redis_generation = generation
+        data = {field: getattr(user, field) for field in CACHED_FIELDS}
+        # The local generation is per process, so this also skips sets that raced other users' invalidations
+        if local_generation == self._local_generation:
+            self._set_local(user.email, data)
+        if redis_generation is None:
+            return
+        try:
+            async with get_redis().pipeline() as pipe:
+                # Only written if no worker invalidated the user in between
+                await pipe.watch(self._generation_key(user.email))
+                if int(await pipe.get(self._generation_key(user.email)) or 0) == redis_generation:
+                    pipe.multi()
+                    pipe.set(self._redis_key(user.email), json.dumps(data), ex=self.redis_ttl)
+                    await pipe.execute()
+                    return
+        except WatchError:
+            pass
+        except Exception as e:
+            logger.warning("User cache Redis write failed: %s", e)
+            return
+        self.stats["discarded_sets"] += 1
+        self._local.pop(user.email, None)
+
+    async def invalidate(self, email: str):
+        self.stats["invalidations"] += 1
+        self._drop_local(email)
+        try:
+            async with get_redis().pipeline() as pipe:
+                pipe.incr(self._generation_key(email))
+                pipe.expire(self._generation_key(email), self.redis_ttl)
+                pipe.delete(self._redis_key(email))
+                await pipe.execute()
+            await get_redis().publish(INVALIDATION_CHANNEL, email)
+        except Exception as e:
+            logger.warning("User cache Redis invalidation failed: %s", e)
+
+    async def listen(self, retry_seconds: float = 1):
+        """Applies invalidations published by other workers until cancelled."""
+        while True:
+            try:
+                async with get_redis().pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Anything invalidated while we were not subscribed is unknown
+                    self._drop_local()
+                    async for message in pubsub.listen():
+                        self.stats["remote_invalidations"] += 1
+                        self._drop_local(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("User cache invalidation listener failed: %s", e)
+            self._drop_local()
+            await asyncio.sleep(retry_seconds)
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "local_size": len(self._local)}
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL_SECONDS,
+)
@@ -0,0 +1,60 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
+from src.auth.utils import get_password_hash, verify_and_update_password
+from src.config import settings
+
+executor = None
+# Jobs running or waiting in the pool; bounded so a login storm fails fast instead of queueing forever
+pending_jobs = 0
+
+# Forking a worker that already runs threads (the threadpool, the outbox dispatcher) can copy
+# locks held by those threads into the child. Hash workers are started by a forkserver instead,
+# a clean process forked before any of them, or spawned where forkserver is unavailable.
+def get_mp_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["src.auth.utils"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def get_executor() -> ProcessPoolExecutor:
+    global executor
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, mp_context=get_mp_context())
+    return executor
+
+# Called from the lifespan so the pool's processes exist before the first login waits for them
+async def start_executor():
+    loop = asyncio.get_running_loop()
+    pool = get_executor()
+    await asyncio.gather(*(loop.run_in_executor(pool, abs, 0) for _ in range(settings.PASSWORD_HASH_WORKERS)))
+
+def shutdown_executor():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+
+async def run_in_hash_pool(fn, *args):
+    global pending_jobs
+    if pending_jobs >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is saturated, try again later",
+            headers={"Retry-After": "1"},
+        )
+    pending_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), fn, *args)
+    finally:
+        pending_jobs -= 1
+
+async def hash_password(password: str) -> str:
+    return await run_in_hash_pool(get_password_hash, password)
+
+# Returns (verified, new_hash); new_hash is set when the stored hash uses outdated parameters
+async def verify_password(plain_password: str, hashed_password: str):
+    return await run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
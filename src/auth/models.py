@@ -11,4 +11,8 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     hashed_password = Column(String)
     avatar_url = Column(String, nullable=True)
+    # Bumped by every write to the user's contacts; see src/contacts/changes.py
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Highest version whose tombstones have been pruned; older sync tokens have expired
+    contacts_pruned_version = Column(Integer, nullable=False, default=0, server_default="0")
     contacts = relationship("Contact", back_populates="owner")
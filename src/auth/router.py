@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from src.auth import schemas, service, models
-from src.database import get_db
-from src.utils.cloudinary import upload_avatar
+from src.auth.cache import user_cache
+from src.config import settings
+from src.database import get_db, run_db, DbSession
+from src.utils.avatars import store_avatar
+from src.utils.rate_limit import rate_limiter
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = service.authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(request: Request, db: DbSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    # Throttled both per client and per account, before any bcrypt work is spent
+    await rate_limiter.hit("auth:token:ip", f"ip:{request.client.host if request.client else 'unknown'}")
+    await rate_limiter.hit("auth:token:email", f"email:{form_data.username.lower()}")
+    user = await service.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,34 +27,41 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = service.create_user(db, user)
+async def register_user(user: schemas.UserCreate, db: DbSession = Depends(get_db)):
+    db_user = await service.register_user(db, user)
     return db_user
 
 @router.get("/verify/{token}", response_model=schemas.User)
-def verify_user(token: str, db: Session = Depends(get_db)):
-    user = service.verify_user(db, token)
+async def verify_user(token: str, db: DbSession = Depends(get_db)):
+    user = await run_db(db, service.verify_user, token)
+    await user_cache.invalidate(user.email)
     return user
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    return service.get_current_user(db, token)
+async def get_current_user(db: DbSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    email = service.decode_access_token(token)
+    if not settings.USER_CACHE_ENABLED:
+        return await run_db(db, service.get_user_by_email, email)
+    user = await user_cache.get(email)
+    if user is None:
+        generation = await user_cache.generation(email)
+        user = await run_db(db, service.get_user_by_email, email)
+        await user_cache.set(user, generation)
+    return user
 
 @router.get("/me", response_model=schemas.User)
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    user = service.get_current_user(db, token)
-    return user
+async def read_current_user(current_user: models.User = Depends(get_current_user)):
+    return current_user
 
 @router.post("/upload-avatar", response_model=schemas.User)
 async def upload_user_avatar(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if file.content_type not in ["image/jpeg", "image/png"]:
         raise HTTPException(status_code=400, detail="Invalid file type")
 
-    avatar_url = upload_avatar(file.file)
-    current_user.avatar_url = avatar_url
-    db.commit()
-    db.refresh(current_user)
-    return current_user
\ No newline at end of file
+    avatar_url = await store_avatar(current_user.id, file)
+    user = await run_db(db, service.update_user_avatar, current_user, avatar_url)
+    await user_cache.invalidate(user.email)
+    return user
@@ -5,23 +5,43 @@ from src.auth import schemas, models
 from src.config import settings
 from datetime import timedelta
 from jose import JWTError, jwt
+from src.auth import hashing
+from src.database import run_db
 from src.auth.utils import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     generate_email_verification_token,
+    build_verification_email,
     send_verification_email,
     confirm_email_verification_token
 )
+from src.outbox.service import enqueue_email
 from src.logging_config import logger
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+def get_user_for_login(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def update_password_hash(db: Session, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+# bcrypt runs in the hashing pool, only the lookups go through the session
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await run_db(db, get_user_for_login, email)
+    if not user:
+        return False
+    verified, new_hash = await hashing.verify_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        await run_db(db, update_password_hash, user, new_hash)
+        logger.info("Rehashed password for user: %s", user.id)
     return user
 
-def create_user(db: Session, user: schemas.UserCreate):
+async def register_user(db: Session, user: schemas.UserCreate):
+    hashed_password = await hashing.hash_password(user.password)
+    return await run_db(db, create_user, user, hashed_password)
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     db_user_by_email = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user_by_email:
         raise HTTPException(
@@ -31,28 +51,32 @@ def create_user(db: Session, user: schemas.UserCreate):
     try:
         db_user = models.User(
             email=user.email,
-            hashed_password=get_password_hash(user.password),
+            hashed_password=hashed_password,
             username=user.username
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
 
-        # Generate email verification token and send email
+        # Generate email verification token; with the outbox the email is committed together with the user
         token = generate_email_verification_token(user.email)
-        send_verification_email(user.email, token)
+        if settings.OUTBOX_ENABLED:
+            subject, body = build_verification_email(token)
+            enqueue_email(db, f"verify:{user.email}", user.email, subject, body)
+        db.commit()
+        db.refresh(db_user)
+        if not settings.OUTBOX_ENABLED:
+            send_verification_email(user.email, token)
 
         return db_user
     except IntegrityError as e:
         db.rollback()
-        logger.error(f"IntegrityError: {e.orig}")
+        logger.error("IntegrityError: %s", e.orig)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
     except Exception as e:
         db.rollback()
-        logger.error(f"Exception: {e}")
+        logger.error("Exception: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while creating the user"
@@ -65,12 +89,15 @@ def create_access_token_for_user(user: models.User):
     )
     return access_token
 
-def get_current_user(db: Session, token: str):
-    credentials_exception = HTTPException(
+def get_credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str) -> str:
+    credentials_exception = get_credentials_exception()
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -80,11 +107,17 @@ def get_current_user(db: Session, token: str):
         token_data = schemas.TokenData(email=email, username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    return token_data.email
+
+def get_user_by_email(db: Session, email: str):
+    user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise get_credentials_exception()
     return user
 
+def get_current_user(db: Session, token: str):
+    return get_user_by_email(db, decode_access_token(token))
+
 def verify_user(db: Session, token: str):
     email = confirm_email_verification_token(token)
     if not email:
@@ -98,3 +131,11 @@ def verify_user(db: Session, token: str):
     db.commit()
     db.refresh(user)
     return user
+
+def update_user_avatar(db: Session, user: models.User, avatar_url: str):
+    # The current user may come from the user cache, so load the row into this session
+    user = db.get(models.User, user.id)
+    user.avatar_url = avatar_url
+    db.commit()
+    db.refresh(user)
+    return user
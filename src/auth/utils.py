@@ -4,14 +4,22 @@ from itsdangerous import URLSafeTimedSerializer
 from datetime import datetime, timedelta
 from src.config import settings
 from typing import Optional
-import smtplib
-from email.mime.text import MIMEText
+from src.utils.smtp import smtp_connection
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below BCRYPT_ROUNDS are reported as deprecated and rehashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -41,14 +49,9 @@ def confirm_email_verification_token(token: str, expiration: int = 3600):
         return False
     return email
 
-def send_verification_email(to_email: str, token: str):
+def build_verification_email(token: str):
     verification_url = f"{settings.FRONTEND_URL}/verify/{token}"
-    msg = MIMEText(f'Click the link to verify your email: {verification_url}')
-    msg['Subject'] = 'Verify your email'
-    msg['From'] = settings.EMAIL_FROM
-    msg['To'] = to_email
-
-    with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-        server.starttls()
-        server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-        server.sendmail(settings.EMAIL_FROM, [to_email], msg.as_string())
+    return 'Verify your email', f'Click the link to verify your email: {verification_url}'
+
+def send_verification_email(to_email: str, token: str):
+    smtp_connection.send(to_email, *build_verification_email(token))
@@ -0,0 +1,100 @@
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.contacts import changes as change_feed, models, schemas
+from src.logging_config import logger
+
+# POST /contacts/batch: creates, updates and deletes applied in one transaction with one bulk
+# statement per kind. Operations are grouped rather than run in order, so a contact id may appear
+# only once per batch. If a bulk statement hits a constraint it is retried item by item in
+# savepoints, so only the conflicting items fail.
+
+def item_result(index: int, op, status_code: int, contact_id: int = None, error: str = None) -> dict:
+    return {"index": index, "op": op, "status": status_code, "id": contact_id, "error": error}
+
+def to_row(contact: schemas.ContactCreate) -> dict:
+    return {**contact.model_dump(), "birthday_key": models.get_birthday_key(contact.birthday)}
+
+def run_bulk(db: Session, items: list, execute):
+    """Run execute(items) in a savepoint; on a conflict retry each item alone.
+
+    Returns a list of (item, outcome) where outcome is execute's result for that item or an IntegrityError.
+    """
+    if not items:
+        return []
+    try:
+        with db.begin_nested():
+            return list(zip(items, execute(items)))
+    except IntegrityError:
+        pass
+    outcomes = []
+    for item in items:
+        try:
+            with db.begin_nested():
+                outcomes.append((item, execute([item])[0]))
+        except IntegrityError as e:
+            outcomes.append((item, e))
+    return outcomes
+
+def apply_batch(db: Session, user_id: int, operations: list) -> list:
+    Op = schemas.BatchOperationType
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        if operation.op == Op.create:
+            if operation.contact is None:
+                results[index] = item_result(index, operation.op, 422, error="contact is required")
+            else:
+                creates.append((index, {**to_row(operation.contact), "user_id": user_id}))
+            continue
+        if operation.id is None:
+            results[index] = item_result(index, operation.op, 422, error="id is required")
+        elif operation.op == Op.update and operation.contact is None:
+            results[index] = item_result(index, operation.op, 422, error="contact is required")
+        elif operation.id in seen_ids:
+            results[index] = item_result(index, operation.op, 422, contact_id=operation.id, error="Contact appears more than once in this batch")
+        else:
+            seen_ids.add(operation.id)
+            (updates if operation.op == Op.update else deletes).append((index, operation))
+
+    # One query scopes every update and delete to the caller's contacts
+    owned = set()
+    if seen_ids:
+        owned = set(db.scalars(select(models.Contact.id).where(models.Contact.user_id == user_id, models.Contact.id.in_(seen_ids))))
+    for index, operation in updates + deletes:
+        if operation.id not in owned:
+            results[index] = item_result(index, operation.op, 404, contact_id=operation.id, error="Not Found")
+    # One change feed version for everything this batch writes
+    version = change_feed.next_change_version(db, user_id) if creates or owned else None
+    creates = [(index, {**row, "change_version": version}) for index, row in creates]
+    updates = [(index, {"id": operation.id, **to_row(operation.contact), "change_version": version}) for index, operation in updates if operation.id in owned]
+    deletes = [(index, operation.id) for index, operation in deletes if operation.id in owned]
+
+    def insert_rows(items):
+        statement = insert(models.Contact).returning(models.Contact.id, sort_by_parameter_order=True)
+        return list(db.scalars(statement, [row for _, row in items]))
+
+    def update_rows(items):
+        db.execute(update(models.Contact), [row for _, row in items])
+        return [row["id"] for _, row in items]
+
+    for (index, _), outcome in run_bulk(db, creates, insert_rows):
+        if isinstance(outcome, IntegrityError):
+            results[index] = item_result(index, Op.create, 409, error="Contact with this email already exists")
+        else:
+            results[index] = item_result(index, Op.create, 201, contact_id=outcome)
+    for (index, row), outcome in run_bulk(db, updates, update_rows):
+        if isinstance(outcome, IntegrityError):
+            results[index] = item_result(index, Op.update, 409, contact_id=row["id"], error="Contact with this email already exists")
+        else:
+            results[index] = item_result(index, Op.update, 200, contact_id=outcome)
+    if deletes:
+        deleted_ids = [contact_id for _, contact_id in deletes]
+        db.execute(delete(models.Contact).where(models.Contact.user_id == user_id, models.Contact.id.in_(deleted_ids)))
+        change_feed.record_tombstones(db, user_id, deleted_ids, version)
+        for index, contact_id in deletes:
+            results[index] = item_result(index, Op.delete, 200, contact_id=contact_id)
+    db.commit()
+    logger.info("Applied batch of %s operations for user: %s", len(operations), user_id)
+    return results
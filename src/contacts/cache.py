@@ -0,0 +1,61 @@
+import hashlib
+import json
+from fastapi import Request, Response, status
+from src.config import settings
+from src.contacts import changes
+from src.database import run_db
+from src.logging_config import logger
+from src.utils.redis_client import get_redis
+
+# Conditional GET support for contact reads. The ETag of a read is derived from the user's
+# users.contacts_version, which every write transaction bumps along with the rows it changes, and
+# the request's path and query, so it changes whenever the response could. The version is read in
+# the same session as the body, before it, so a body is never older than its ETag. Responses may
+# also be cached in Redis under the same (user, version, request) key, skipping the body query.
+
+async def get_version(db, user_id: int) -> int:
+    return await run_db(db, changes.get_contacts_version, user_id)
+
+def get_request_digest(request: Request) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+async def conditional_response(request: Request, db, user_id: int, load) -> Response:
+    """`load` is an async callable returning (JSON body bytes, extra headers), reading through `db`."""
+    if not settings.CONTACTS_ETAG_ENABLED:
+        body, headers = await load()
+        return Response(body, media_type="application/json", headers=headers)
+
+    version = await get_version(db, user_id)
+    digest = get_request_digest(request)
+    etag = f'"{version}-{digest}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    cache_key = f"contacts:response:{user_id}:{version}:{digest}"
+    if settings.CONTACTS_RESPONSE_CACHE_ENABLED:
+        try:
+            cached = await get_redis().get(cache_key)
+        except Exception as e:
+            logger.warning("Contacts response cache lookup failed: %s", e)
+            cached = None
+        if cached is not None:
+            entry = json.loads(cached)
+            return Response(entry["body"], media_type="application/json", headers={**entry["headers"], **cache_headers})
+
+    body, headers = await load()
+    if settings.CONTACTS_RESPONSE_CACHE_ENABLED:
+        try:
+            entry = json.dumps({"body": body.decode(), "headers": headers})
+            await get_redis().set(cache_key, entry, ex=settings.CONTACTS_RESPONSE_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning("Contacts response cache write failed: %s", e)
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
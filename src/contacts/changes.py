@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+from src.auth.models import User
+from src.config import settings
+from src.contacts import models
+from src.contacts.pagination import decode_cursor, encode_cursor
+from src.logging_config import logger
+
+# Change feed for incremental sync (GET /contacts/changes).
+#
+# Every transaction that writes a user's contacts first bumps users.contacts_version with an
+# UPDATE ... RETURNING. The row lock this takes serializes the user's writes, so versions commit
+# in order, and every contact written (or tombstone left behind by a delete) in the transaction
+# is stamped with the new version. The feed returns rows ordered by (change_version, id).
+#
+# Sync tokens are opaque cursors of [version, id]. A token with an id was cut mid-delta and
+# resumes after that row. A token with a null id means "everything through this version", so
+# when the user's contacts_version still equals it, nothing changed and the feed answers from
+# that one primary key lookup.
+#
+# Tombstones are kept for TOMBSTONE_RETENTION_DAYS. prune_tombstones (run daily with
+# `python -m src.contacts.changes`) deletes older ones and raises users.contacts_pruned_version to
+# the highest version it removed. A token from before that version could miss deletions, so it
+# gets 410 Gone, and the client starts over with a full sync without a token.
+
+def next_change_version(db: Session, user_id: int) -> int:
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(contacts_version=User.contacts_version + 1)
+        .returning(User.contacts_version)
+    )
+    return db.execute(statement).scalar_one()
+
+def get_contacts_version(db: Session, user_id: int) -> int:
+    return db.execute(select(User.contacts_version).where(User.id == user_id)).scalar_one()
+
+def record_tombstones(db: Session, user_id: int, contact_ids: list, version: int):
+    if contact_ids:
+        db.execute(insert(models.ContactTombstone), [
+            {"contact_id": contact_id, "user_id": user_id, "change_version": version}
+            for contact_id in contact_ids
+        ])
+
+def get_changes(db: Session, user_id: int, since: str = None, limit: int = 500) -> dict:
+    since_version, after_id = decode_cursor(since, 2, types=(int, (int, type(None)))) if since else (0, None)
+    current_version, pruned_version = db.execute(
+        select(User.contacts_version, User.contacts_pruned_version).where(User.id == user_id)
+    ).one()
+    # A token at the pruned version is only complete if it wasn't cut mid-delta
+    if since and (since_version < pruned_version or (since_version == pruned_version and after_id is not None)):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Sync token expired, sync again without a token")
+    if current_version <= since_version and after_id is None:
+        return {"changes": [], "next_token": since or encode_cursor(current_version, None), "has_more": False}
+
+    Contact, Tombstone = models.Contact, models.ContactTombstone
+
+    def after(version_column, id_column):
+        if after_id is None:
+            return version_column > since_version
+        return tuple_(version_column, id_column) > tuple_(since_version, after_id)
+
+    # Writes committed after the version lookup are left for the next sync
+    contacts = db.execute(
+        select(*models.RESPONSE_COLUMNS, Contact.change_version, Contact.updated_at)
+        .where(Contact.user_id == user_id, after(Contact.change_version, Contact.id), Contact.change_version <= current_version)
+        .order_by(Contact.change_version, Contact.id)
+        .limit(limit + 1)
+    ).all()
+    changes = [
+        {"op": "upsert", "id": row.id, "version": row.change_version, "changed_at": row.updated_at, "contact": row._asdict()}
+        for row in contacts
+    ]
+    # A first sync (no token) starts from an empty book, so there is nothing to delete
+    if since:
+        tombstones = db.execute(
+            select(Tombstone.contact_id, Tombstone.change_version, Tombstone.deleted_at)
+            .where(Tombstone.user_id == user_id, after(Tombstone.change_version, Tombstone.contact_id), Tombstone.change_version <= current_version)
+            .order_by(Tombstone.change_version, Tombstone.contact_id)
+            .limit(limit + 1)
+        ).all()
+        changes.extend(
+            {"op": "delete", "id": row.contact_id, "version": row.change_version, "changed_at": row.deleted_at, "contact": None}
+            for row in tombstones
+        )
+        changes.sort(key=lambda change: (change["version"], change["id"]))
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        next_token = encode_cursor(changes[-1]["version"], changes[-1]["id"])
+    else:
+        next_token = encode_cursor(current_version, None)
+    return {"changes": changes, "next_token": next_token, "has_more": has_more}
+
+def prune_tombstones(db: Session, older_than: datetime) -> int:
+    """Deletes tombstones left before `older_than`, one user per transaction; returns how many."""
+    Tombstone = models.ContactTombstone
+    floors = db.execute(
+        select(Tombstone.user_id, func.max(Tombstone.change_version))
+        .where(Tombstone.deleted_at < older_than)
+        .group_by(Tombstone.user_id)
+    ).all()
+    pruned = 0
+    for user_id, version in floors:
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.contacts_pruned_version < version)
+            .values(contacts_pruned_version=version)
+        )
+        pruned += db.execute(delete(Tombstone).where(Tombstone.user_id == user_id, Tombstone.change_version <= version)).rowcount
+        db.commit()
+    return pruned
+
+if __name__ == "__main__":
+    from src.database import SessionLocal
+    with SessionLocal() as db:
+        count = prune_tombstones(db, datetime.utcnow() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS))
+    logger.info("Pruned %s contact tombstones older than %s days", count, settings.TOMBSTONE_RETENTION_DAYS)
@@ -0,0 +1,195 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from src.config import settings
+from src.contacts import changes as change_feed, models
+
+# Duplicate detection within one user's book.
+#
+# Comparing every pair is quadratic, so contacts are first grouped into blocks by keys that
+# duplicates are likely to share: the normalized email, the normalized phone number, and the
+# birthday together with the initial of either name. Only contacts within a block are compared,
+# which keeps the work near-linear. A pair is a duplicate when:
+#   - their emails normalize to the same address;
+#   - they share a phone number and their names are at least DUPLICATES_PHONE_NAME_THRESHOLD similar;
+#   - they share a birthday and their names are at least DUPLICATES_NAME_THRESHOLD similar.
+# Names are compared with their words sorted, so "Ivan Koval" matches "Koval Ivan". Similarity is
+# difflib's ratio, which tolerates typos such as swapped letters. As that is slow, pairs whose
+# character bigrams barely overlap are rejected first with a set intersection. Duplicate pairs
+# are joined into clusters, which POST /contacts/duplicates/merge collapses into one contact.
+#
+# Loading the rows and clustering them are separate steps, so the CPU-bound clustering can run
+# off the event loop (see service.find_duplicates) whichever session type loaded the rows.
+
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+# Enough trailing digits to ignore country and trunk prefixes, e.g. +380 67... vs 067...
+PHONE_KEY_DIGITS = 9
+MIN_PHONE_DIGITS = 7
+NON_WORD = re.compile(r"[^\w\s]")
+NON_DIGIT = re.compile(r"\D")
+# Bigram overlap (Dice coefficient) below which names are not compared further
+MIN_BIGRAM_SIMILARITY = 0.65
+
+def normalize_name(name: str) -> str:
+    name = (name or "").lower()
+    if not name.isascii():
+        name = "".join(char for char in unicodedata.normalize("NFKD", name) if not unicodedata.combining(char))
+    return " ".join(NON_WORD.sub(" ", name).split())
+
+def name_key(first_name: str, last_name: str) -> tuple:
+    """(words sorted and joined, set of their character bigrams) for name_similarity."""
+    words = sorted(normalize_name(f"{first_name or ''} {last_name or ''}").split())
+    bigrams = frozenset(padded[i:i + 2] for padded in (f" {word} " for word in words) for i in range(len(padded) - 1))
+    return " ".join(words), bigrams
+
+def normalize_email(email: str) -> str:
+    local, _, domain = (email or "").strip().lower().partition("@")
+    local = local.split("+", 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}" if local and domain else ""
+
+def normalize_phone(phone: str) -> str:
+    digits = NON_DIGIT.sub("", phone or "")
+    return digits[-PHONE_KEY_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else ""
+
+def name_similarity(a: tuple, b: tuple) -> float:
+    if not a[0] or not b[0]:
+        return 0.0
+    if a[0] == b[0]:
+        return 1.0
+    if 2 * len(a[1] & b[1]) / (len(a[1]) + len(b[1])) < MIN_BIGRAM_SIMILARITY:
+        return 0.0
+    return SequenceMatcher(None, a[0], b[0]).ratio()
+
+class DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+def build_blocks(rows: list, initials: list) -> dict:
+    blocks = defaultdict(list)
+    for index, row in enumerate(rows):
+        email = normalize_email(row.email)
+        if email:
+            blocks[("email", email)].append(index)
+        phone = normalize_phone(row.phone)
+        if phone:
+            blocks[("phone", phone)].append(index)
+        if row.birthday is not None:
+            for initial in initials[index]:
+                blocks[("name", row.birthday, initial)].append(index)
+    return blocks
+
+def load_contacts(db: Session, user_id: int) -> list:
+    return db.execute(
+        select(*models.RESPONSE_COLUMNS).where(models.Contact.user_id == user_id).order_by(models.Contact.id)
+    ).all()
+
+def cluster_duplicates(rows: list) -> dict:
+    # Books repeat the same names a lot, so keys are built once per distinct name
+    names, initials, keys = [], [], {}
+    for row in rows:
+        key = keys.get((row.first_name, row.last_name))
+        if key is None:
+            key = keys[(row.first_name, row.last_name)] = name_key(row.first_name, row.last_name)
+        names.append(key)
+        initials.append({word[0] for word in key[0].split()})
+
+    thresholds = {"email": 0.0, "phone": settings.DUPLICATES_PHONE_NAME_THRESHOLD, "name": settings.DUPLICATES_NAME_THRESHOLD}
+    clusters = DisjointSet(len(rows))
+    reasons = defaultdict(set)
+    compared = set()
+    skipped_blocks = 0
+    for key, members in build_blocks(rows, initials).items():
+        if len(members) < 2:
+            continue
+        if len(members) > settings.DUPLICATES_MAX_BLOCK_SIZE:
+            skipped_blocks += 1
+            continue
+        kind, threshold = key[0], thresholds[key[0]]
+        for position, a in enumerate(members):
+            for b in members[position + 1:]:
+                # Only name blocks overlap: two contacts can share both initials and a birthday
+                if kind == "name":
+                    if (a, b) in compared:
+                        continue
+                    compared.add((a, b))
+                if kind == "email" or name_similarity(names[a], names[b]) >= threshold:
+                    clusters.union(a, b)
+                    reasons[(a, b)].add(kind)
+
+    members_by_root, reasons_by_root = defaultdict(set), defaultdict(set)
+    for (a, b), kinds in reasons.items():
+        root = clusters.find(a)
+        members_by_root[root].update((a, b))
+        reasons_by_root[root] |= kinds
+
+    result = []
+    for root, members in members_by_root.items():
+        contacts = [rows[index]._asdict() for index in sorted(members)]
+        result.append({
+            "contact_ids": [contact["id"] for contact in contacts],
+            "reasons": sorted(reasons_by_root[root]),
+            "contacts": contacts,
+        })
+    result.sort(key=lambda cluster: (-len(cluster["contact_ids"]), cluster["contact_ids"][0]))
+    return {"scanned": len(rows), "skipped_blocks": skipped_blocks, "clusters": result}
+
+def merge_contacts(db: Session, user_id: int, primary_id: int, duplicate_ids: list):
+    """Collapse duplicate_ids into primary_id in one transaction; returns the merged row or None."""
+    duplicate_ids = sorted(set(duplicate_ids) - {primary_id})
+    if not duplicate_ids:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Nothing to merge into the primary contact")
+    Contact = models.Contact
+    version = change_feed.next_change_version(db, user_id)
+    rows = db.execute(
+        select(*models.RESPONSE_COLUMNS)
+        .where(Contact.user_id == user_id, Contact.id.in_([primary_id, *duplicate_ids]))
+        .order_by(Contact.id)
+        .with_for_update()
+    ).all()
+    by_id = {row.id: row for row in rows}
+    if len(by_id) != len(duplicate_ids) + 1:
+        db.rollback()
+        return None
+
+    primary = by_id[primary_id]
+    duplicates = [by_id[contact_id] for contact_id in duplicate_ids]
+    # The primary's values win; its empty fields are filled from the duplicates, and notes are kept from all
+    values = {"change_version": version}
+    for field in ("first_name", "last_name", "phone", "birthday"):
+        if not getattr(primary, field):
+            fallback = next((getattr(row, field) for row in duplicates if getattr(row, field)), None)
+            if fallback is not None:
+                values[field] = fallback
+    if "birthday" in values:
+        values["birthday_key"] = models.get_birthday_key(values["birthday"])
+    notes = []
+    for row in [primary, *duplicates]:
+        if row.additional_info and row.additional_info not in notes:
+            notes.append(row.additional_info)
+    if notes:
+        values["additional_info"] = "\n".join(notes)
+
+    db.execute(delete(Contact).where(Contact.user_id == user_id, Contact.id.in_(duplicate_ids)))
+    change_feed.record_tombstones(db, user_id, duplicate_ids, version)
+    merged = db.execute(
+        update(Contact).where(Contact.id == primary_id).values(**values).returning(*models.RESPONSE_COLUMNS)
+    ).first()
+    db.commit()
+    return merged
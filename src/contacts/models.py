@@ -1,16 +1,80 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, DDL, event
+from sqlalchemy.orm import relationship, validates
 from src.database import Base
 
+# Month and day of a birth date as MMDD, so birthday windows are integer ranges that ignore the year
+def get_birthday_key(birthday):
+    if birthday is None:
+        return None
+    return birthday.month * 100 + birthday.day
+
 class Contact(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        # Serves keyset pagination of GET /contacts: WHERE owner = ? AND (last_name, id) > (?, ?)
+        Index("ix_contacts_owner_last_name_id", "owner_id", "last_name", "id"),
+        Index("ix_contacts_owner_birthday_key", "owner_id", "birthday_key"),
+        # Serves the change feed: WHERE owner = ? AND (change_version, id) > (?, ?)
+        Index("ix_contacts_owner_change_version_id", "owner_id", "change_version", "id"),
+        # Trigram indexes serving ILIKE '%q%' search; Postgres only, other backends use src/contacts/search.py
+        Index("ix_contacts_first_name_trgm", "first_name", postgresql_using="gin", postgresql_ops={"first_name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_contacts_last_name_trgm", "last_name", postgresql_using="gin", postgresql_ops={"last_name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_contacts_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
+    # Not nullable: NULLs would fall outside the (last_name, id) keyset comparison
+    last_name = Column(String, index=True, nullable=False)
     email = Column(String, unique=True, index=True)
     phone = Column(String)
     birthday = Column(Date)
+    # Kept in sync with birthday; bulk statements must set it through get_birthday_key
+    birthday_key = Column(Integer)
     additional_info = Column(String, nullable=True)
-    owner_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column("owner_id", Integer, ForeignKey('users.id'))
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # The owner's contacts_version in the transaction that last wrote this row
+    change_version = Column(Integer, nullable=False)
     owner = relationship("User", back_populates="contacts")
+
+    @validates("birthday")
+    def validate_birthday(self, key, birthday):
+        self.birthday_key = get_birthday_key(birthday)
+        return birthday
+
+class ContactTombstone(Base):
+    """Left behind by a deleted contact so the change feed can report the deletion."""
+    __tablename__ = 'contact_tombstones'
+    __table_args__ = (
+        Index("ix_contact_tombstones_owner_change_version_contact_id", "owner_id", "change_version", "contact_id"),
+        # For pruning by age, see changes.prune_tombstones
+        Index("ix_contact_tombstones_deleted_at", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    contact_id = Column(Integer, nullable=False)
+    user_id = Column("owner_id", Integer, ForeignKey('users.id'), nullable=False)
+    change_version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# The columns of the Contact response schema. Read endpoints select these as plain rows instead
+# of loading entities, skipping identity map and attribute instrumentation work for every row.
+RESPONSE_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.birthday,
+    Contact.additional_info,
+    Contact.user_id,
+)
+
+# The trigram operator classes above need the pg_trgm extension
+event.listen(
+    Contact.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,23 @@
+import base64
+import json
+from fastapi import HTTPException, status
+
+# Cursors are opaque to clients: base64url encoded JSON of the last row's sort key values
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# `types` gives the accepted type(s) of each value, so a tampered cursor is a 400 rather than a failing query
+def decode_cursor(cursor: str, size: int, types: tuple = None) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size or (types and not all(map(is_cursor_value, values, types))):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+    return values
+
+def is_cursor_value(value, types) -> bool:
+    # JSON true/false would pass as ints
+    return isinstance(value, types) and not isinstance(value, bool)
@@ -1,50 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List
-from src.database import get_db
-from src.contacts import schemas, service
+from src.database import get_db, read_session, replica_router, run_db, DbSession
+from src.config import settings
+from src.contacts import batch, cache, schemas, serializers, service, transfer
+from src.utils.rate_limit import rate_limiter
 from src.auth.router import get_current_user
 from src.auth.models import User
-from fastapi_limiter.depends import RateLimiter
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.Contact, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=5, seconds=60))])
-def create_contact(contact: schemas.ContactCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return service.create_contact(db=db, contact=contact, user_id=current_user.id)
+# Read-only endpoints may be served by a replica, see src/database.py
+async def get_read_db(current_user: User = Depends(get_current_user)):
+    async with read_session(current_user.id) as db:
+        yield db
+
+# The write already bumped users.contacts_version; keep the user's reads on the primary until replicas catch up
+async def contacts_changed(user_id: int):
+    await replica_router.mark_write(user_id)
+
+@router.post("/", response_model=schemas.Contact, status_code=status.HTTP_201_CREATED)
+async def create_contact(contact: schemas.ContactCreate, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    await rate_limiter.hit("contacts:create", f"user:{current_user.id}")
+    db_contact = await run_db(db, service.create_contact, contact=contact, user_id=current_user.id)
+    await contacts_changed(current_user.id)
+    return db_contact
 
 @router.get("/", response_model=List[schemas.Contact])
-def read_contacts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    contacts = service.get_contacts(db, user_id=current_user.id, skip=skip, limit=limit)
-    return contacts
+async def read_contacts(request: Request, skip: int = 0, limit: int = 10, after: str = None, db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    # `after` takes a cursor from a previous X-Next-Cursor header; skip/limit offset paging still works without it
+    async def load():
+        contacts = await run_db(db, service.get_contacts, user_id=current_user.id, skip=skip, limit=limit, after=after)
+        next_cursor = service.get_next_cursor(contacts, limit)
+        return serializers.dump_contact_rows(contacts), {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return await cache.conditional_response(request, db, current_user.id, load)
+
+# Counts against the limit per operation rather than per request
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def batch_contacts(payload: schemas.BatchRequest, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if len(payload.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch")
+    await rate_limiter.hit("contacts:batch", f"user:{current_user.id}", weight=len(payload.operations))
+    results = await run_db(db, batch.apply_batch, current_user.id, payload.operations)
+    if any(result["status"] < 300 for result in results):
+        await contacts_changed(current_user.id)
+    return {"results": results}
+
+# Body is read as a stream: a CSV file with a header row, or one JSON object per line
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_contacts(request: Request, format: schemas.TransferFormat = schemas.TransferFormat.csv, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    await rate_limiter.hit("contacts:import", f"user:{current_user.id}")
+    report = await transfer.import_contacts(db, current_user.id, request.stream(), format)
+    if report["imported"]:
+        await contacts_changed(current_user.id)
+    return report
+
+@router.get("/export")
+async def export_contacts(format: schemas.TransferFormat = schemas.TransferFormat.csv, current_user: User = Depends(get_current_user)):
+    media_type = "text/csv" if format == schemas.TransferFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        transfer.export_contacts(current_user.id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format.value}"'},
+    )
+
+# Clusters of likely duplicates in the caller's book; the scan is cached per contacts version like other reads
+@router.get("/duplicates", response_model=schemas.DuplicatesResponse)
+async def find_duplicates(request: Request, db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    async def load():
+        await rate_limiter.hit("contacts:duplicates", f"user:{current_user.id}")
+        result = await service.find_duplicates(db, user_id=current_user.id)
+        return serializers.dump_duplicates(result), {}
+    return await cache.conditional_response(request, db, current_user.id, load)
+
+@router.post("/duplicates/merge", response_model=schemas.Contact)
+async def merge_duplicates(payload: schemas.MergeRequest, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    row = await run_db(db, service.merge_contacts, user_id=current_user.id, primary_id=payload.primary_id, duplicate_ids=payload.duplicate_ids)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Primary or duplicate contact not found")
+    await contacts_changed(current_user.id)
+    return Response(serializers.dump_contact_row(row), media_type="application/json")
+
+# Incremental sync: everything created, updated or deleted since the token from the previous call
+@router.get("/changes", response_model=schemas.ChangesResponse)
+async def contact_changes(since: str = None, limit: int = Query(500, ge=1, le=1000), db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    return await run_db(db, service.get_changes, user_id=current_user.id, since=since, limit=limit)
 
 @router.get("/{contact_id}", response_model=schemas.Contact)
-def read_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_contact = service.get_contact(db, contact_id=contact_id, user_id=current_user.id)
-    if db_contact is None:
-        raise HTTPException(status_code=404, detail={f"ID:{contact_id}": "Not Found"})
-    return db_contact
+async def read_contact(request: Request, contact_id: int, db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    async def load():
+        db_contact = await run_db(db, service.get_contact, contact_id=contact_id, user_id=current_user.id)
+        if db_contact is None:
+            raise HTTPException(status_code=404, detail={f"ID:{contact_id}": "Not Found"})
+        return serializers.dump_contact(db_contact), {}
+    return await cache.conditional_response(request, db, current_user.id, load)
 
 @router.put("/{contact_id}", response_model=schemas.Contact)
-def update_contact(contact_id: int, contact: schemas.ContactCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_contact = service.update_contact(db, contact_id=contact_id, contact=contact, user_id=current_user.id)
-    if db_contact is None:
+async def update_contact(contact_id: int, contact: schemas.ContactCreate, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    row = await run_db(db, service.update_contact, contact_id=contact_id, contact=contact, user_id=current_user.id)
+    if row is None:
         raise HTTPException(status_code=404, detail={f"ID:{contact_id}": "Not Found"})
-    return db_contact
+    await contacts_changed(current_user.id)
+    return Response(serializers.dump_contact_row(row), media_type="application/json")
+
+@router.patch("/{contact_id}", response_model=schemas.Contact)
+async def patch_contact(contact_id: int, contact: schemas.ContactPatch, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    row = await run_db(db, service.update_contact, contact_id=contact_id, contact=contact, user_id=current_user.id, partial=True)
+    if row is None:
+        raise HTTPException(status_code=404, detail={f"ID:{contact_id}": "Not Found"})
+    await contacts_changed(current_user.id)
+    return Response(serializers.dump_contact_row(row), media_type="application/json")
 
 @router.delete("/{contact_id}", response_model=schemas.Contact)
-def delete_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    db_contact = service.delete_contact(db, contact_id=contact_id, user_id=current_user.id)
-    if db_contact is None:
+async def delete_contact(contact_id: int, db: DbSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    row = await run_db(db, service.delete_contact, contact_id=contact_id, user_id=current_user.id)
+    if row is None:
         raise HTTPException(status_code=404, detail={f"ID:{contact_id}": "Not Found"})
-    return db_contact
+    await contacts_changed(current_user.id)
+    return Response(serializers.dump_contact_row(row), media_type="application/json")
 
 @router.get("/search/", response_model=List[schemas.Contact])
-def search_contacts(name: str = None, email: str = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    contacts = service.search_contacts(db, user_id=current_user.id, name=name, email=email)
-    return contacts
+async def search_contacts(name: str = None, email: str = None, limit: int = Query(20, ge=1, le=100), after: str = None, db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    contacts, next_cursor = await run_db(db, service.search_contacts, user_id=current_user.id, name=name, email=email, limit=limit, after=after)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return Response(serializers.dump_contact_rows(contacts), media_type="application/json", headers=headers)
 
 @router.get("/birthdays/", response_model=List[schemas.Contact])
-def contacts_with_upcoming_birthdays(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    contacts = service.get_contacts_with_upcoming_birthdays(db, user_id=current_user.id)
-    return contacts
+async def contacts_with_upcoming_birthdays(days: int = Query(7, ge=0, le=366), db: DbSession = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    contacts = await run_db(db, service.get_contacts_with_upcoming_birthdays, user_id=current_user.id, days=days)
+    return Response(serializers.dump_contact_rows(contacts), media_type="application/json")
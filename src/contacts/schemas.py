@@ -1,6 +1,8 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import date
+from pydantic import BaseModel, EmailStr, field_validator
+from typing import List, Optional
+from typing_extensions import TypedDict
+from datetime import date, datetime
+from enum import Enum
 
 class ContactBase(BaseModel):
     first_name: str
@@ -16,9 +18,106 @@ class ContactCreate(ContactBase):
 class ContactUpdate(ContactBase):
     pass
 
+# PATCH body: any subset of the fields. Omitted fields are left unchanged; only
+# additional_info can be cleared with null.
+class ContactPatch(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone", "birthday")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class Contact(ContactBase):
     id: int
     user_id: int
 
     class Config:
         orm_mode = True
+
+# Same fields as Contact for rows read straight from the database: validates into plain dicts
+# without building model instances, and email is not re-checked as it was validated on write
+class ContactRow(TypedDict):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    birthday: date
+    additional_info: Optional[str]
+    user_id: int
+
+class TransferFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+class BatchOperationType(str, Enum):
+    create = "create"
+    update = "update"
+    delete = "delete"
+
+class BatchOperation(BaseModel):
+    op: BatchOperationType
+    id: Optional[int] = None
+    contact: Optional[ContactCreate] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchItemResult(BaseModel):
+    index: int
+    op: BatchOperationType
+    status: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+
+class ChangeType(str, Enum):
+    upsert = "upsert"
+    delete = "delete"
+
+class ContactChange(BaseModel):
+    op: ChangeType
+    id: int
+    version: int
+    changed_at: datetime
+    contact: Optional[Contact] = None
+
+class ChangesResponse(BaseModel):
+    changes: List[ContactChange]
+    # Pass as `since` on the next call; keep calling while has_more is true
+    next_token: Optional[str] = None
+    has_more: bool
+
+class DuplicateCluster(BaseModel):
+    contact_ids: List[int]
+    # Which keys matched: email, phone and/or name (same birthday)
+    reasons: List[str]
+    contacts: List[Contact]
+
+class DuplicatesResponse(BaseModel):
+    scanned: int
+    skipped_blocks: int
+    clusters: List[DuplicateCluster]
+
+class MergeRequest(BaseModel):
+    primary_id: int
+    duplicate_ids: List[int]
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.orm import Session
+from src.auth.models import User
+from src.config import settings
+from src.contacts import models
+from src.contacts.pagination import decode_cursor, encode_cursor
+
+# Contact search. On Postgres the ILIKE filters are served by the pg_trgm GIN indexes declared
+# in models.py and results are ranked by trigram similarity. Other databases (SQLite in tests)
+# use an in-process trigram index per user with the same ranking.
+# Results are ordered by (score desc, id) and paged with a cursor on those two values.
+#
+# Each in-process index records the users.contacts_version it reflects. Every lookup reads the
+# current version (a primary key probe), and when another request or worker has written since,
+# applies just the contacts and tombstones of the newer versions (see changes.py). Writes that
+# bypass the change feed are picked up by a full rebuild once SEARCH_INDEX_TTL_SECONDS passes.
+
+def search_contacts(db: Session, user_id: int, name: str = None, email: str = None, limit: int = 20, after: str = None):
+    cursor = decode_cursor(after, 2, types=((int, float), int)) if after else None
+    if db.bind.dialect.name == "postgresql":
+        ranked = search_postgres(db, user_id, name, email, limit, cursor)
+    else:
+        ranked = search_ngram_index(db, user_id, name, email, limit, cursor)
+    next_cursor = None
+    if len(ranked) == limit:
+        score, contact = ranked[-1]
+        next_cursor = encode_cursor(score, contact.id)
+    return [contact for _, contact in ranked], next_cursor
+
+def escape_like(value: str) -> str:
+    """`value` as a literal inside a LIKE pattern with ESCAPE '\\'."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_postgres(db: Session, user_id: int, name: str, email: str, limit: int, cursor: list):
+    Contact = models.Contact
+    query = db.query(*models.RESPONSE_COLUMNS).filter(Contact.user_id == user_id)
+    score = literal(0.0)
+    if name:
+        pattern = f"%{escape_like(name)}%"
+        query = query.filter(Contact.first_name.ilike(pattern, escape="\\") | Contact.last_name.ilike(pattern, escape="\\"))
+        score = score + func.greatest(func.similarity(Contact.first_name, name), func.similarity(Contact.last_name, name))
+    if email:
+        query = query.filter(Contact.email.ilike(f"%{escape_like(email)}%", escape="\\"))
+        score = score + func.similarity(Contact.email, email)
+    if cursor:
+        last_score, last_id = cursor
+        query = query.filter(or_(score < last_score, and_(score == last_score, Contact.id > last_id)))
+    rows = query.add_columns(score.label("score")).order_by(score.desc(), Contact.id).limit(limit).all()
+    return [(float(row.score), row) for row in rows]
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# Same shape as pg_trgm similarity(): Jaccard index of the padded trigram sets
+def similarity(a: str, b: str) -> float:
+    left, right = trigrams(f"  {a} "), trigrams(f"  {b} ")
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+class NgramIndex:
+    """Trigram postings for one user's contacts as of `version`, matching the ILIKE '%q%' semantics.
+
+    Readers and delta updates hold `lock`, as requests for one user may run in several threads.
+    """
+
+    def __init__(self, rows, version: int):
+        self.values = {}
+        self.postings = {"name": defaultdict(set), "email": defaultdict(set)}
+        self.version = version
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+        for contact_id, first_name, last_name, contact_email in rows:
+            self.add(contact_id, first_name, last_name, contact_email)
+
+    def add(self, contact_id: int, first_name: str, last_name: str, contact_email: str):
+        values = ((first_name or "").lower(), (last_name or "").lower(), (contact_email or "").lower())
+        self.values[contact_id] = values
+        for gram in trigrams(values[0]) | trigrams(values[1]):
+            self.postings["name"][gram].add(contact_id)
+        for gram in trigrams(values[2]):
+            self.postings["email"][gram].add(contact_id)
+
+    def remove(self, contact_id: int):
+        values = self.values.pop(contact_id, None)
+        if values is None:
+            return
+        for field, grams in (("name", trigrams(values[0]) | trigrams(values[1])), ("email", trigrams(values[2]))):
+            postings = self.postings[field]
+            for gram in grams:
+                postings[gram].discard(contact_id)
+                if not postings[gram]:
+                    del postings[gram]
+
+    def candidates(self, field: str, query: str):
+        grams = trigrams(query)
+        if not grams:
+            # Shorter than a trigram, every contact is a candidate
+            return set(self.values)
+        lists = sorted((self.postings[field].get(gram, set()) for gram in grams), key=len)
+        return set.intersection(*lists)
+
+    def search(self, name: str = None, email: str = None):
+        # Starts from the postings of the first field, so the cost follows the matches, not the book
+        ids = None
+        if name:
+            name = name.lower()
+            ids = {i for i in self.candidates("name", name) if name in self.values[i][0] or name in self.values[i][1]}
+        if email:
+            email = email.lower()
+            candidates = self.candidates("email", email)
+            if ids is not None:
+                candidates &= ids
+            ids = {i for i in candidates if email in self.values[i][2]}
+        if ids is None:
+            ids = set(self.values)
+        ranked = []
+        for contact_id in ids:
+            first_name, last_name, contact_email = self.values[contact_id]
+            score = 0.0
+            if name:
+                score += max(similarity(first_name, name), similarity(last_name, name))
+            if email:
+                score += similarity(contact_email, email)
+            ranked.append((score, contact_id))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+ngram_indexes = OrderedDict()
+ngram_indexes_lock = threading.Lock()
+
+def build_ngram_index(db: Session, user_id: int, version: int) -> NgramIndex:
+    Contact = models.Contact
+    # Rows written after `version` are left to the next delta, which re-adds them
+    rows = db.query(Contact.id, Contact.first_name, Contact.last_name, Contact.email).filter(
+        Contact.user_id == user_id, Contact.change_version <= version
+    ).all()
+    return NgramIndex(rows, version)
+
+def apply_ngram_delta(db: Session, user_id: int, index: NgramIndex, version: int):
+    """Brings the index from index.version up to `version` with the rows written in between."""
+    Contact, Tombstone = models.Contact, models.ContactTombstone
+    written = db.query(Contact.change_version, Contact.id, Contact.first_name, Contact.last_name, Contact.email).filter(
+        Contact.user_id == user_id, Contact.change_version > index.version, Contact.change_version <= version
+    ).all()
+    deleted = db.query(Tombstone.change_version, Tombstone.contact_id).filter(
+        Tombstone.user_id == user_id, Tombstone.change_version > index.version, Tombstone.change_version <= version
+    ).all()
+    changes = [(row.change_version, 0, row.contact_id, None) for row in deleted]
+    changes += [(row.change_version, 1, row.id, (row.first_name, row.last_name, row.email)) for row in written]
+    # In version order with deletes first, so an id deleted and then reused (SQLite may reuse the highest id) stays
+    for _, _, contact_id, values in sorted(changes, key=lambda change: change[:3]):
+        index.remove(contact_id)
+        if values is not None:
+            index.add(contact_id, *values)
+    index.version = version
+
+def get_ngram_index(db: Session, user_id: int) -> NgramIndex:
+    version, pruned_version = db.query(User.contacts_version, User.contacts_pruned_version).filter(User.id == user_id).one_or_none() or (0, 0)
+    with ngram_indexes_lock:
+        index = ngram_indexes.get(user_id)
+        if index is not None:
+            ngram_indexes.move_to_end(user_id)
+    # Deltas come from tombstones, so an index older than the pruned ones is rebuilt
+    fresh = index is not None and index.version >= pruned_version and time.monotonic() - index.built_at < settings.SEARCH_INDEX_TTL_SECONDS
+    if fresh:
+        # A replica behind the index's version just gets the newer index
+        if index.version < version:
+            with index.lock:
+                if index.version < version:
+                    apply_ngram_delta(db, user_id, index, version)
+        return index
+    index = build_ngram_index(db, user_id, version)
+    with ngram_indexes_lock:
+        ngram_indexes[user_id] = index
+        while len(ngram_indexes) > settings.SEARCH_INDEX_MAX_USERS:
+            ngram_indexes.popitem(last=False)
+    return index
+
+def search_ngram_index(db: Session, user_id: int, name: str, email: str, limit: int, cursor: list):
+    index = get_ngram_index(db, user_id)
+    with index.lock:
+        ranked = index.search(name, email)
+    if cursor:
+        last_score, last_id = cursor
+        ranked = [item for item in ranked if item[0] < last_score or (item[0] == last_score and item[1] > last_id)]
+    ranked = ranked[:limit]
+    if not ranked:
+        return []
+    ids = [contact_id for _, contact_id in ranked]
+    contacts = {contact.id: contact for contact in db.query(*models.RESPONSE_COLUMNS).filter(models.Contact.user_id == user_id, models.Contact.id.in_(ids))}
+    return [(score, contacts[contact_id]) for score, contact_id in ranked if contact_id in contacts]
@@ -0,0 +1,24 @@
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from src.contacts import schemas
+
+# Response bodies for contact reads, built once per request instead of going through FastAPI's
+# response_model validation and jsonable_encoder. Adapters are compiled once at import.
+contact_adapter = TypeAdapter(schemas.Contact)
+contact_row_adapter = TypeAdapter(schemas.ContactRow)
+contact_rows_adapter = TypeAdapter(List[schemas.ContactRow])
+duplicates_adapter = TypeAdapter(schemas.DuplicatesResponse)
+
+def dump_contact(contact) -> bytes:
+    return contact_adapter.dump_json(contact_adapter.validate_python(contact, from_attributes=True))
+
+def dump_contact_rows(rows) -> bytes:
+    """`rows` are Core rows selected with models.RESPONSE_COLUMNS; extra columns are dropped."""
+    return orjson.dumps(contact_rows_adapter.validate_python([row._asdict() for row in rows]))
+
+def dump_contact_row(row) -> bytes:
+    return orjson.dumps(contact_row_adapter.validate_python(row._asdict()))
+
+def dump_duplicates(result: dict) -> bytes:
+    return duplicates_adapter.dump_json(duplicates_adapter.validate_python(result))
@@ -1,102 +1,198 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from sqlalchemy import case, delete, or_, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from src.contacts import models, schemas
-from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
+from src.contacts import changes as change_feed, duplicates, models, schemas, search
+from src.contacts.pagination import decode_cursor, encode_cursor
+from src.database import run_db
+from datetime import date, timedelta
+import logging
 from src.logging_config import logger
 
+# High-volume read lines, sampled through LOG_SAMPLE_RATES={"contacts.reads": ...}
+reads_logger = logging.getLogger("contacts.reads")
+
 def create_contact(db: Session, contact: schemas.ContactCreate, user_id: int):
     try:
-        db_contact = models.Contact(**contact.model_dump(), user_id=user_id)
+        version = change_feed.next_change_version(db, user_id)
+        db_contact = models.Contact(**contact.model_dump(), user_id=user_id, change_version=version)
         db.add(db_contact)
         db.commit()
         db.refresh(db_contact)
-        logger.info(f"Contact created: {db_contact.id} for user: {user_id}")
+        logger.info("Contact created: %s for user: %s", db_contact.id, user_id)
         return db_contact
     except IntegrityError as e:
         db.rollback()
-        logger.error(f"Error creating contact for user {user_id}: {e}")
+        logger.error("Error creating contact for user %s: %s", user_id, e)
         raise HTTPException(status_code=409, detail="Contact with this email already exists")
     except Exception as e:
         db.rollback()
-        logger.error(f"Error creating contact for user {user_id}: {e}")
+        logger.error("Error creating contact for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Error creating contact")
 
-def get_contacts(db: Session, user_id: int, skip: int = 0, limit: int = 10):
+def get_contacts(db: Session, user_id: int, skip: int = 0, limit: int = 10, after: str = None):
     try:
-        contacts = db.query(models.Contact).filter(models.Contact.user_id == user_id).offset(skip).limit(limit).all()
-        logger.info(f"Retrieved {len(contacts)} contacts for user: {user_id}")
+        query = db.query(*models.RESPONSE_COLUMNS).filter(models.Contact.user_id == user_id)
+        if after:
+            last_name, contact_id = decode_cursor(after, 2, types=(str, int))
+            query = query.filter(tuple_(models.Contact.last_name, models.Contact.id) > tuple_(last_name, contact_id))
+        query = query.order_by(models.Contact.last_name, models.Contact.id)
+        if not after:
+            query = query.offset(skip)
+        contacts = query.limit(limit).all()
+        reads_logger.info("Retrieved %s contacts for user: %s", len(contacts), user_id)
         return contacts
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error retrieving contacts for user {user_id}: {e}")
+        logger.error("Error retrieving contacts for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Error retrieving contacts")
 
+def get_next_cursor(contacts: list, limit: int):
+    if not contacts or len(contacts) < limit:
+        return None
+    last = contacts[-1]
+    return encode_cursor(last.last_name, last.id)
+
 def get_contact(db: Session, contact_id: int, user_id: int) -> models.Contact:
     try:
         contact = db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.user_id == user_id).first()
         if contact:
-            logger.info(f"Contact retrieved: {contact.id} for user: {user_id}")
+            reads_logger.info("Contact retrieved: %s for user: %s", contact.id, user_id)
         else:
-            logger.info(f"No contact found with ID {contact_id} for user {user_id}")
+            reads_logger.info("No contact found with ID %s for user %s", contact_id, user_id)
         return contact
     except Exception as e:
-        logger.error(f"Error retrieving contact {contact_id} for user {user_id}: {e}")
+        logger.error("Error retrieving contact %s for user %s: %s", contact_id, user_id, e)
         raise HTTPException(status_code=500, detail="Error retrieving contact")
 
-def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate, user_id: int) -> models.Contact:
+def write_contact_changes(db: Session, contact_id: int, user_id: int, changes: dict):
+    """One UPDATE ... RETURNING scoped to the owner; returns the updated row or None."""
+    Contact = models.Contact
+    if not changes:
+        return db.query(*models.RESPONSE_COLUMNS).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+    if "birthday" in changes:
+        changes["birthday_key"] = models.get_birthday_key(changes["birthday"])
+    changes["change_version"] = change_feed.next_change_version(db, user_id)
+    statement = (
+        update(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user_id)
+        .values(**changes)
+        .returning(*models.RESPONSE_COLUMNS)
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        # Nothing was written, don't leave a version bump behind
+        db.rollback()
+        return None
+    db.commit()
+    return row
+
+def update_contact(db: Session, contact_id: int, contact: schemas.ContactUpdate, user_id: int, partial: bool = False):
+    # partial=True (PATCH) writes only the fields present in the request body
     try:
-        db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.user_id == user_id).first()
-        if db_contact is None:
-            logger.info(f"No contact found with ID {contact_id} for user {user_id}")
+        row = write_contact_changes(db, contact_id, user_id, contact.model_dump(exclude_unset=partial))
+        if row is None:
+            logger.info("No contact found with ID %s for user %s", contact_id, user_id)
             return None
-        for key, value in contact.model_dump().items():
-            setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
-        logger.info(f"Contact updated: {db_contact.id} for user: {user_id}")
-        return db_contact
+        logger.info("Contact updated: %s for user: %s", row.id, user_id)
+        return row
+    except IntegrityError as e:
+        db.rollback()
+        logger.error("Error updating contact %s for user %s: %s", contact_id, user_id, e)
+        raise HTTPException(status_code=409, detail="Contact with this email already exists")
     except Exception as e:
-        logger.error(f"Error updating contact {contact_id} for user {user_id}: {e}")
+        db.rollback()
+        logger.error("Error updating contact %s for user %s: %s", contact_id, user_id, e)
         raise HTTPException(status_code=500, detail="Error updating contact")
 
-def delete_contact(db: Session, contact_id: int, user_id: int) -> models.Contact:
+def delete_contact(db: Session, contact_id: int, user_id: int):
     try:
-        db_contact = db.query(models.Contact).filter(models.Contact.id == contact_id, models.Contact.user_id == user_id).first()
-        if db_contact is None:
-            logger.info(f"No contact found with ID {contact_id} for user {user_id}")
+        version = change_feed.next_change_version(db, user_id)
+        statement = (
+            delete(models.Contact)
+            .where(models.Contact.id == contact_id, models.Contact.user_id == user_id)
+            .returning(*models.RESPONSE_COLUMNS)
+        )
+        row = db.execute(statement).first()
+        if row is None:
+            db.rollback()
+            logger.info("No contact found with ID %s for user %s", contact_id, user_id)
             return None
-        db.delete(db_contact)
+        change_feed.record_tombstones(db, user_id, [row.id], version)
         db.commit()
-        logger.info(f"Contact deleted: {db_contact.id} for user: {user_id}")
-        return db_contact
+        logger.info("Contact deleted: %s for user: %s", row.id, user_id)
+        return row
     except Exception as e:
-        logger.error(f"Error deleting contact {contact_id} for user {user_id}: {e}")
+        db.rollback()
+        logger.error("Error deleting contact %s for user %s: %s", contact_id, user_id, e)
         raise HTTPException(status_code=500, detail="Error deleting contact")
 
-def search_contacts(db: Session, user_id: int, name: str = None, email: str = None):
+def get_changes(db: Session, user_id: int, since: str = None, limit: int = 500):
     try:
-        query = db.query(models.Contact).filter(models.Contact.user_id == user_id)
-        if name:
-            query = query.filter((models.Contact.first_name.ilike(f"%{name}%")) | (models.Contact.last_name.ilike(f"%{name}%")))
-        if email:
-            query = query.filter(models.Contact.email.ilike(f"%{email}%"))
-        contacts = query.all()
-        logger.info(f"Found {len(contacts)} contacts matching criteria for user: {user_id}")
-        return contacts
+        result = change_feed.get_changes(db, user_id, since=since, limit=limit)
+        reads_logger.info("Returned %s contact changes for user: %s", len(result["changes"]), user_id)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error retrieving contact changes for user %s: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Error retrieving contact changes")
+
+async def find_duplicates(db, user_id: int):
+    try:
+        rows = await run_db(db, duplicates.load_contacts, user_id)
+        result = await run_in_threadpool(duplicates.cluster_duplicates, rows)
+        reads_logger.info("Found %s duplicate clusters among %s contacts for user: %s", len(result["clusters"]), result["scanned"], user_id)
+        return result
+    except Exception as e:
+        logger.error("Error finding duplicate contacts for user %s: %s", user_id, e)
+        raise HTTPException(status_code=500, detail="Error finding duplicate contacts")
+
+def merge_contacts(db: Session, user_id: int, primary_id: int, duplicate_ids: list):
+    try:
+        row = duplicates.merge_contacts(db, user_id, primary_id, duplicate_ids)
+        if row is None:
+            logger.info("Merge into contact %s failed for user %s: not all contacts found", primary_id, user_id)
+            return None
+        logger.info("Merged contacts %s into %s for user: %s", duplicate_ids, primary_id, user_id)
+        return row
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error("Error merging contacts into %s for user %s: %s", primary_id, user_id, e)
+        raise HTTPException(status_code=500, detail="Error merging contacts")
+
+def search_contacts(db: Session, user_id: int, name: str = None, email: str = None, limit: int = 20, after: str = None):
+    try:
+        contacts, next_cursor = search.search_contacts(db, user_id, name=name, email=email, limit=limit, after=after)
+        reads_logger.info("Found %s contacts matching criteria for user: %s", len(contacts), user_id)
+        return contacts, next_cursor
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error searching contacts for user {user_id}: {e}")
+        logger.error("Error searching contacts for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Error searching contacts")
 
-def get_contacts_with_upcoming_birthdays(db: Session, user_id: int):
+def get_contacts_with_upcoming_birthdays(db: Session, user_id: int, days: int = 7):
     try:
-        today = datetime.today()
-        upcoming = today + timedelta(days=7)
-        contacts = db.query(models.Contact).filter(
-            models.Contact.user_id == user_id,
-            models.Contact.birthday.between(today, upcoming)
-        ).all()
-        logger.info(f"Found {len(contacts)} contacts with upcoming birthdays for user: {user_id}")
+        today = date.today()
+        start_key = models.get_birthday_key(today)
+        end_key = models.get_birthday_key(today + timedelta(days=days))
+        birthday_key = models.Contact.birthday_key
+        query = db.query(*models.RESPONSE_COLUMNS).filter(models.Contact.user_id == user_id)
+        if days < 365:
+            if start_key <= end_key:
+                query = query.filter(birthday_key.between(start_key, end_key))
+            else:
+                # The window wraps around the new year
+                query = query.filter(or_(birthday_key >= start_key, birthday_key <= end_key))
+        # Soonest birthdays first: the rest of this year, then the beginning of the next one
+        contacts = query.order_by(case((birthday_key >= start_key, 0), else_=1), birthday_key, models.Contact.id).all()
+        reads_logger.info("Found %s contacts with upcoming birthdays for user: %s", len(contacts), user_id)
         return contacts
     except Exception as e:
-        logger.error(f"Error retrieving contacts with upcoming birthdays for user {user_id}: {e}")
+        logger.error("Error retrieving contacts with upcoming birthdays for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail="Error retrieving contacts with upcoming birthdays")
@@ -0,0 +1,191 @@
+import anyio
+import codecs
+import csv
+import io
+import json
+from contextlib import aclosing
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from src.config import settings
+from src.contacts import changes as change_feed, models, schemas
+from src.database import read_session, run_db
+from src.logging_config import logger
+
+# Streaming bulk import and export of contacts as CSV or NDJSON.
+# Imports are parsed line by line from the request body and inserted in batches of
+# IMPORT_BATCH_SIZE; exports page through a server-side cursor with yield_per.
+
+EXPORT_FIELDS = ("id", "first_name", "last_name", "email", "phone", "birthday", "additional_info")
+
+async def iter_lines(chunks):
+    """Decode a byte stream incrementally and yield (line number, text line)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield line_number + 1, buffer.rstrip("\r")
+
+async def iter_csv_records(lines):
+    header = None
+    pending, start = "", None
+    async for line_number, line in lines:
+        # A quoted field may contain newlines; keep joining lines while a quote is open
+        pending = f"{pending}\n{line}" if start is not None else line
+        start = start if start is not None else line_number
+        if pending.count('"') % 2:
+            continue
+        record_line, start = start, None
+        if not pending.strip():
+            continue
+        values = next(csv.reader([pending]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield record_line, dict(zip(header, values))
+    if start is not None:
+        yield start, ValueError("Unterminated quoted field")
+
+async def iter_ndjson_records(lines):
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        yield line_number, record if isinstance(record, dict) else ValueError("Expected a JSON object")
+
+def to_contact_row(record: dict, user_id: int) -> dict:
+    # Empty CSV cells count as missing, so optional fields fall back to their defaults
+    contact = schemas.ContactCreate(**{key: value for key, value in record.items() if value not in ("", None)})
+    return {
+        **contact.model_dump(),
+        "birthday_key": models.get_birthday_key(contact.birthday),
+        "user_id": user_id,
+    }
+
+def insert_contacts_batch(db: Session, user_id: int, batch: list):
+    """Insert (line number, row) pairs; returns (inserted count, per-row errors)."""
+    version = change_feed.next_change_version(db, user_id)
+    batch = [(line_number, {**row, "change_version": version}) for line_number, row in batch]
+    rows = [row for _, row in batch]
+    try:
+        with db.begin_nested():
+            db.execute(insert(models.Contact), rows)
+        db.commit()
+        return len(rows), []
+    except IntegrityError:
+        pass
+    # Some row conflicts, retry one by one so only the offending rows are rejected
+    inserted, errors = 0, []
+    for line_number, row in batch:
+        try:
+            with db.begin_nested():
+                db.execute(insert(models.Contact), [row])
+            inserted += 1
+        except IntegrityError:
+            errors.append({"line": line_number, "error": "Contact with this email already exists"})
+    db.commit()
+    return inserted, errors
+
+async def import_contacts(db, user_id: int, chunks, format: schemas.TransferFormat) -> dict:
+    lines = iter_lines(chunks)
+    records = iter_csv_records(lines) if format == schemas.TransferFormat.csv else iter_ndjson_records(lines)
+    report = {"imported": 0, "failed": 0, "errors": []}
+
+    def add_errors(errors):
+        report["failed"] += len(errors)
+        room = settings.IMPORT_MAX_REPORTED_ERRORS - len(report["errors"])
+        report["errors"].extend(errors[:max(room, 0)])
+
+    async def flush(batch):
+        inserted, errors = await run_db(db, insert_contacts_batch, user_id, batch)
+        report["imported"] += inserted
+        add_errors(errors)
+
+    batch = []
+    async for line_number, record in records:
+        if isinstance(record, Exception):
+            add_errors([{"line": line_number, "error": str(record)}])
+            continue
+        try:
+            batch.append((line_number, to_contact_row(record, user_id)))
+        except ValidationError as e:
+            add_errors([{"line": line_number, "error": str(e)}])
+            continue
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    logger.info("Imported %s contacts for user: %s, %s rejected", report['imported'], user_id, report['failed'])
+    return report
+
+def get_export_query(user_id: int):
+    columns = [getattr(models.Contact, field) for field in EXPORT_FIELDS]
+    return (
+        select(*columns)
+        .where(models.Contact.user_id == user_id)
+        .order_by(models.Contact.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+
+def iter_export_partitions_sync(db: Session, user_id: int):
+    result = db.execute(get_export_query(user_id))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+# The request's session is closed before the body is streamed, so exports open their own, routed
+# like other reads. A client disconnecting mid-stream cancels the response, so the server-side
+# cursor is closed under a shielded scope before the session goes back to the pool.
+async def iter_export_partitions(user_id: int):
+    async with read_session(user_id) as db:
+        if isinstance(db, AsyncSession):
+            result = await db.stream(get_export_query(user_id))
+            try:
+                async for partition in result.partitions():
+                    yield partition
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await result.close()
+        else:
+            iterator = iter_export_partitions_sync(db, user_id)
+            try:
+                async for partition in iterate_in_threadpool(iterator):
+                    yield partition
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(iterator.close)
+
+def format_csv(rows, header: bool = False) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(rows)
+    return output.getvalue()
+
+def format_ndjson(rows) -> str:
+    return "".join(json.dumps(dict(row._mapping), default=str) + "\n" for row in rows)
+
+async def export_contacts(user_id: int, format: schemas.TransferFormat):
+    if format == schemas.TransferFormat.csv:
+        yield format_csv([], header=True)
+    # Closed explicitly when the response stops early, instead of whenever the generator is collected
+    async with aclosing(iter_export_partitions(user_id)) as partitions:
+        async for partition in partitions:
+            yield format_csv(partition) if format == schemas.TransferFormat.csv else format_ndjson(partition)
@@ -1,31 +1,271 @@
-import logging
-from sqlalchemy import create_engine
+import anyio
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Union
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from src.config import settings
+from src.logging_config import logger
+from src.metrics.instrumentation import instrument_engine
+from src.utils.redis_client import get_redis
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
+# Async drivers used when ASYNC_DATABASE_URL is not given explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+class PoolWaitStatsMixin:
+    """Records how long checkouts wait for a free connection and how many time out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+class StatsQueuePool(PoolWaitStatsMixin, QueuePool):
+    pass
+
+class StatsAsyncAdaptedQueuePool(PoolWaitStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+def get_engine_options(url: str, is_async: bool = False) -> dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    # SQLite uses its own file/memory pools, the sizing options only apply to server databases
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=StatsAsyncAdaptedQueuePool if is_async else StatsQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+def get_pool_stats(pool) -> dict:
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, PoolWaitStatsMixin):
+        stats.update(
+            wait_count=pool.wait_count,
+            wait_time_total_ms=round(pool.wait_time_total * 1000, 3),
+            wait_time_max_ms=round(pool.wait_time_max * 1000, 3),
+            timeouts=pool.timeouts,
+        )
+    return stats
+
+engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# Check database connection
-def check_db_connection():
-    try:
+# Async engine, only built when async mode is enabled so the async drivers stay optional
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL, is_async=True))
+    instrument_engine(async_engine.sync_engine)
+    # Objects are serialized after the service call returns, outside of the greenlet,
+    # so they must not be expired on commit
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+DbSession = Union[Session, AsyncSession]
+
+# Readiness probe against the engine that serves requests
+async def ping_database():
+    if async_engine is not None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        return
+
+    def ping():
         with engine.connect() as connection:
-            logging.info("Successfully connected to the database.")
-    except Exception as e:
-        logging.error(f"Database connection failed: {e}")
-        raise
+            connection.execute(text("SELECT 1"))
+    await run_in_threadpool(ping)
+
+class Replica:
+    """A read replica's engine, session factory and last known health."""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url, **get_engine_options(url))
+        instrument_engine(self.engine)
+        self.async_engine = None
+        if settings.DATABASE_ASYNC:
+            async_url = get_async_database_url(url)
+            self.async_engine = create_async_engine(async_url, **get_engine_options(async_url, is_async=True))
+            instrument_engine(self.async_engine.sync_engine)
+            self.session_factory = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        else:
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        self.checked_at = 0.0
+        self.check_lock = asyncio.Lock()
+        # A dropped connection in the middle of a request takes the replica out until its next check
+        event.listen(self.async_engine.sync_engine if self.async_engine else self.engine, "handle_error", self.on_error)
+
+    def on_error(self, context):
+        if context.is_disconnect and self.healthy:
+            logger.warning("Replica %s lost its connection, reads fall back to the primary", self.name)
+            self.healthy = False
+            self.checked_at = time.monotonic()
+
+    async def ping(self):
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return
+
+        def ping():
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        await run_in_threadpool(ping)
+
+    async def check(self):
+        # One probe per replica at a time; requests arriving meanwhile use the last result
+        if self.check_lock.locked() or time.monotonic() - self.checked_at < settings.DB_REPLICA_CHECK_SECONDS:
+            return
+        async with self.check_lock:
+            try:
+                await asyncio.wait_for(self.ping(), timeout=settings.DB_REPLICA_CHECK_TIMEOUT_SECONDS)
+                healthy = True
+            except Exception as e:
+                logger.warning("Replica %s failed its health check: %s", self.name, str(e) or type(e).__name__)
+                healthy = False
+            if healthy and not self.healthy:
+                logger.info("Replica %s is healthy again", self.name)
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+
+class ReplicaRouter:
+    """Picks the session factory for a user's reads: a healthy replica in round robin, or the
+    primary while the user is sticky after their own write or when no replica is available.
+
+    Stickiness is shared between workers through Redis (`db:sticky:{user_id}` with a TTL); this
+    worker's own writes are also remembered locally, and a Redis failure routes to the primary.
+    """
+
+    def __init__(self, urls: list):
+        self.replicas = [Replica(url) for url in urls]
+        self.counter = itertools.count()
+        self.sticky_until = OrderedDict()
+
+    def sticky_key(self, user_id: int) -> str:
+        return f"db:sticky:{user_id}"
+
+    async def mark_write(self, user_id: int):
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        self.sticky_until[user_id] = now + settings.DB_REPLICA_STICKY_SECONDS
+        self.sticky_until.move_to_end(user_id)
+        # Entries share one TTL, so the oldest ones are at the front
+        while self.sticky_until and next(iter(self.sticky_until.values())) <= now:
+            self.sticky_until.popitem(last=False)
+        try:
+            ttl = max(int(settings.DB_REPLICA_STICKY_SECONDS * 1000), 1)
+            await asyncio.wait_for(get_redis().set(self.sticky_key(user_id), 1, px=ttl), timeout=settings.DB_REPLICA_CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("Replica stickiness write failed for user %s: %s", user_id, str(e) or type(e).__name__)
+
+    async def is_sticky(self, user_id: int) -> bool:
+        if self.sticky_until.get(user_id, 0.0) > time.monotonic():
+            return True
+        try:
+            return bool(await asyncio.wait_for(get_redis().exists(self.sticky_key(user_id)), timeout=settings.DB_REPLICA_CHECK_TIMEOUT_SECONDS))
+        except Exception as e:
+            logger.warning("Replica stickiness lookup failed for user %s: %s", user_id, str(e) or type(e).__name__)
+            return True
+
+    async def choose(self, user_id: int):
+        """Returns a Replica, or None for the primary."""
+        if not self.replicas or await self.is_sticky(user_id):
+            return None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self.counter) % len(self.replicas)]
+            await replica.check()
+            if replica.healthy:
+                return replica
+        return None
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS)
 
 # Get DB session
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-# Check database connection on startup
-check_db_connection()
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+get_db = get_async_db if settings.DATABASE_ASYNC else get_sync_db
+
+# Session for a read-only request on behalf of a user, routed through replica_router;
+# write endpoints keep using get_db and call replica_router.mark_write after committing
+@asynccontextmanager
+async def read_session(user_id: int):
+    replica = await replica_router.choose(user_id)
+    if replica is not None:
+        db = replica.session_factory()
+    else:
+        db = AsyncSessionLocal() if settings.DATABASE_ASYNC else SessionLocal()
+    try:
+        yield db
+    finally:
+        # Shielded, so a cancelled request (e.g. a client leaving a streamed export) still returns the connection
+        with anyio.CancelScope(shield=True):
+            if isinstance(db, AsyncSession):
+                await db.close()
+            else:
+                await run_in_threadpool(db.close)
+
+# Await a sync service function against whichever session get_db yielded:
+# on an AsyncSession it runs on the event loop through run_sync, otherwise in the threadpool
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
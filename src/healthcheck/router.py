@@ -1,15 +1,35 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from src.database import get_db
-from src.healthcheck.schemas import HealthCheckResponse
-from src.database import check_db_connection
+from typing import Dict
+from fastapi import APIRouter, Response, status
+from src.healthcheck import service
+from src.healthcheck.schemas import HealthCheckResponse, ReadinessResponse, PoolStats, UserCacheStatsResponse
+from src.auth.cache import user_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=HealthCheckResponse)
-def health_check(db: Session = Depends(get_db)):
-    try:
-        check_db_connection()
+async def health_check():
+    readiness = await service.get_readiness()
+    if readiness["status"] == "ok":
         return {"status": "ok"}
-    except Exception as e:
-        return {"status": "unhealthy", "details": str(e)}
+    failed = [f"{name}: {result}" for name, result in readiness["checks"].items() if result != "ok"]
+    return {"status": "unhealthy", "details": "; ".join(failed)}
+
+# Liveness only says the process is serving requests; it never touches the database or Redis
+@router.get("/live", response_model=HealthCheckResponse)
+async def liveness():
+    return {"status": "ok"}
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness(response: Response):
+    result = await service.get_readiness()
+    if result["status"] != "ok":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
+
+@router.get("/pool", response_model=Dict[str, PoolStats])
+def pool_stats():
+    return service.get_pools_stats()
+
+@router.get("/user-cache", response_model=UserCacheStatsResponse)
+def user_cache_stats():
+    return user_cache.get_stats()
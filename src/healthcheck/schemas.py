@@ -1,5 +1,32 @@
 from pydantic import BaseModel
+from typing import Dict, Optional
 
 class HealthCheckResponse(BaseModel):
     status: str
     details: str = None
+
+class ReadinessResponse(BaseModel):
+    status: str
+    checks: Dict[str, str]
+
+class PoolStats(BaseModel):
+    pool: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    wait_count: Optional[int] = None
+    wait_time_total_ms: Optional[float] = None
+    wait_time_max_ms: Optional[float] = None
+    timeouts: Optional[int] = None
+    # Read replicas only
+    healthy: Optional[bool] = None
+
+class UserCacheStatsResponse(BaseModel):
+    local_hits: int
+    redis_hits: int
+    misses: int
+    invalidations: int
+    remote_invalidations: int
+    discarded_sets: int
+    local_size: int
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from src.config import settings
+from src.database import ping_database, engine, async_engine, get_pool_stats, replica_router
+from src.utils.redis_client import get_redis
+
+readiness_lock = asyncio.Lock()
+readiness_result = None
+readiness_checked_at = 0.0
+
+async def run_check(check) -> str:
+    try:
+        await asyncio.wait_for(check(), timeout=settings.HEALTHCHECK_TIMEOUT_SECONDS)
+        return "ok"
+    except Exception as e:
+        return f"unhealthy: {str(e) or type(e).__name__}"
+
+async def ping_redis():
+    await get_redis().ping()
+
+async def get_readiness() -> dict:
+    global readiness_result, readiness_checked_at
+    async with readiness_lock:
+        # Concurrent probes wait for the check in flight and share its result
+        if readiness_result is None or time.monotonic() - readiness_checked_at > settings.HEALTHCHECK_CACHE_SECONDS:
+            database, redis = await asyncio.gather(run_check(ping_database), run_check(ping_redis))
+            checks = {"database": database, "redis": redis}
+            status = "ok" if all(result == "ok" for result in checks.values()) else "unhealthy"
+            readiness_result = {"status": status, "checks": checks}
+            readiness_checked_at = time.monotonic()
+        return readiness_result
+
+def get_pools_stats() -> dict:
+    pools = {"sync": get_pool_stats(engine.pool)}
+    if async_engine is not None:
+        pools["async"] = get_pool_stats(async_engine.pool)
+    for replica in replica_router.replicas:
+        replica_engine = replica.async_engine or replica.engine
+        pools[f"replica {replica.name}"] = {**get_pool_stats(replica_engine.pool), "healthy": replica.healthy}
+    return pools
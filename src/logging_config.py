@@ -1,6 +1,13 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
 from uvicorn.config import LOGGING_CONFIG as uvicorn_log_config
+from src.config import settings
 
 # Ensure the logs directory exists
 logs_root_path = os.path.join(os.path.dirname(__file__), "../logs")
@@ -12,28 +19,97 @@ log_formatter = logging.Formatter(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
-# Stream handler
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(log_formatter)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and exception if any."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of INFO and DEBUG records per logger; warnings and errors always pass.
+
+    Rates apply to the named logger and its children, e.g. {"contacts.reads": 0.01}.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition(".")[0]
+        return True
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records unformatted, so %-style messages are rendered on the listener thread.
+
+    Arguments must not be mutated after logging; pass plain values rather than live objects.
+    """
 
-# File handler for application logs
-file_handler = logging.FileHandler(os.path.join(logs_root_path, "app.log"))
-file_handler.setFormatter(log_formatter)
+    def prepare(self, record):
+        return record
+
+def make_formatter():
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter(datefmt='%Y-%m-%dT%H:%M:%S')
+    return log_formatter
+
+def log_file_path(filename: str) -> str:
+    if settings.LOG_FILES_PER_PROCESS:
+        name, extension = os.path.splitext(filename)
+        filename = f"{name}.{os.getpid()}{extension}"
+    return os.path.join(logs_root_path, filename)
+
+def make_file_handler(filename: str):
+    handler = logging.handlers.RotatingFileHandler(
+        log_file_path(filename),
+        maxBytes=settings.LOG_MAX_BYTES,
+        backupCount=settings.LOG_BACKUP_COUNT,
+    )
+    handler.setFormatter(make_formatter())
+    return handler
+
+# Handlers do their blocking I/O on a listener thread; request code only puts records on a queue
+def attach_queue(target: logging.Logger, handlers: list):
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    target.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Stream handler
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(make_formatter())
 
 # Configure Uvicorn logging
 uvicorn_log_config['formatters']['default']['fmt'] = log_formatter._fmt
 uvicorn_log_config['formatters']['default']['datefmt'] = log_formatter.datefmt
 
-# File handler for Uvicorn logs
-uvicorn_file_handler = logging.FileHandler(os.path.join(logs_root_path, "uvicorn.log"))
-uvicorn_file_handler.setFormatter(log_formatter)
-logging.getLogger("uvicorn").addHandler(uvicorn_file_handler)
+# File handler for Uvicorn logs; without files Uvicorn keeps its own console handlers
+uvicorn_listener = None
+if settings.LOG_FILES_ENABLED:
+    uvicorn_listener = attach_queue(logging.getLogger("uvicorn"), [make_file_handler("uvicorn.log")])
 
 # Configure the root logger
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[file_handler, stream_handler]
-)
+logging.getLogger().setLevel(settings.LOG_LEVEL)
+app_handlers = [make_file_handler("app.log"), stream_handler] if settings.LOG_FILES_ENABLED else [stream_handler]
+app_listener = attach_queue(logging.getLogger(), app_handlers)
 
 logger = logging.getLogger(__name__)
 logger.info("Logging is set up.")
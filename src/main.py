@@ -1,23 +1,62 @@
+import time
+
+# Taken before any other import so the cold start metric includes module loading
+APP_IMPORT_STARTED = time.perf_counter()
+
+import os
+from contextlib import asynccontextmanager
 from src.logging_config import logger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
-from redis import asyncio as aioredis
-from src.database import engine, Base
-from src.auth import models as auth_models
+from fastapi.staticfiles import StaticFiles
+from prometheus_client import Gauge
+from src.database import ping_database
+from src.outbox.dispatcher import outbox_dispatcher
+from src.config import settings
 from src.auth.router import router as auth_router
 from src.contacts.router import router as contacts_router
 from src.healthcheck.router import router as healthcheck_router
-from src.config import settings
+from src.metrics.router import router as metrics_router
+from src.metrics.instrumentation import MetricsMiddleware
+from src.utils.admission import AdmissionControlMiddleware
+from src.utils.body_limit import MULTIPART_OVERHEAD_BYTES, BodySizeLimitMiddleware
+from src.auth.hashing import shutdown_executor, start_executor
+from src.auth.cache import user_cache
+
+COLD_START_SECONDS = Gauge("app_cold_start_seconds", "Time from importing src.main until the worker is ready to serve")
+IMPORT_SECONDS = Gauge("app_import_seconds", "Time spent importing src.main and its dependencies")
 
 logger.info("Starting application setup")
 
-# Create the database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by migrations (`alembic upgrade head`), not created on import.
+# Connections and third-party clients are set up here, once per worker, when it starts serving.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ping_database()
+    await start_executor()
+    if settings.OUTBOX_ENABLED:
+        outbox_dispatcher.start()
+    if settings.USER_CACHE_ENABLED:
+        user_cache.start()
+    cold_start = time.perf_counter() - APP_IMPORT_STARTED
+    COLD_START_SECONDS.set(cold_start)
+    logger.info("Worker ready in %.3fs (imports took %.3fs)", cold_start, APP_IMPORT_SECONDS)
+    yield
+    await user_cache.stop()
+    shutdown_executor()
+    outbox_dispatcher.stop()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Oversized avatar uploads are refused before they are spooled
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/auth/upload-avatar": settings.AVATAR_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+})
+
+# Sheds load past what the connection pool can serve; innermost, so its 503s get CORS headers and metrics
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
 
 # Set up CORS middleware
 app.add_middleware(
@@ -26,17 +65,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination cursor and cache validators for browser clients
 )
 
-@app.on_event("startup")
-async def startup():
-    redis = aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(redis)
+# Per-route latency and SQL metrics, served on /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(contacts_router, prefix="/contacts", tags=["contacts"])
 app.include_router(healthcheck_router, prefix="/healthcheck", tags=["healthcheck"])
+app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+
+# Serve avatars written by the local storage backend
+if settings.AVATAR_STORAGE_BACKEND == "local":
+    os.makedirs(settings.AVATAR_LOCAL_DIR, exist_ok=True)
+    app.mount(settings.AVATAR_LOCAL_URL_PATH, StaticFiles(directory=settings.AVATAR_LOCAL_DIR), name="avatars")
 
 # Root endpoint
 @app.get("/")
@@ -44,4 +88,6 @@ def read_root():
     logger.info("Root endpoint accessed")
     return {"message": "Welcome to my FastAPI application"}
 
+APP_IMPORT_SECONDS = time.perf_counter() - APP_IMPORT_STARTED
+IMPORT_SECONDS.set(APP_IMPORT_SECONDS)
 logger.info("Application setup complete")
@@ -0,0 +1,151 @@
+import cProfile
+import heapq
+import io
+import pstats
+import random
+import threading
+import time
+from collections import Counter as CallCounter
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.config import settings
+from src.logging_config import logger
+
+# Per-request timing and SQL instrumentation. The middleware opens a RequestStats for each
+# HTTP request in a context variable; engine and session event hooks fill it in from
+# whichever thread or greenlet runs the query, since both inherit the request's context.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ["route"],
+)
+LAZY_LOADS = Counter(
+    "db_lazy_loads_total", "Relationship lazy loads", ["relationship"],
+)
+N_PLUS_ONE = Counter(
+    "db_n_plus_one_total", "Requests that lazy loaded one relationship repeatedly", ["route", "relationship"],
+)
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.lazy_loads = CallCounter()
+
+current_request = ContextVar("current_request", default=None)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+def do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_relationship_load:
+        return
+    path = orm_execute_state.loader_strategy_path
+    relationship = str(path[-1]) if path else "unknown"
+    LAZY_LOADS.labels(relationship).inc()
+    stats = current_request.get()
+    if stats is not None:
+        stats.lazy_loads[relationship] += 1
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+# Session-wide, so it also covers the sync sessions behind AsyncSession
+event.listen(Session, "do_orm_execute", do_orm_execute)
+
+class SlowRequestProfiler:
+    """Profiles a sample of requests and keeps the slowest PROFILING_KEEP_SLOWEST of them.
+
+    Only one request is profiled at a time, and cProfile sees the whole thread, so the profile
+    of an async request can include work of other requests interleaved on the event loop.
+    """
+
+    def __init__(self, sample_rate: float, keep: int):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self._busy = threading.Lock()
+        self._slowest = []
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, label: str, elapsed: float):
+        profiler.disable()
+        self._busy.release()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(30)
+        entry = (elapsed, time.time(), label, output.getvalue())
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def dump(self) -> str:
+        parts = []
+        for elapsed, _, label, report in sorted(self._slowest, reverse=True):
+            parts.append(f"### {label} {elapsed * 1000:.1f} ms\n{report}")
+        return "\n".join(parts)
+
+profiler = SlowRequestProfiler(settings.PROFILING_SAMPLE_RATE, settings.PROFILING_KEEP_SLOWEST)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, SQL count/time and lazy loads per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_profiler = profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            # Label by route template rather than raw path to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route_path, status_code).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route_path).observe(stats.queries)
+            REQUEST_DB_TIME.labels(route_path).observe(stats.db_time)
+            for relationship, count in stats.lazy_loads.items():
+                if count >= settings.N_PLUS_ONE_THRESHOLD:
+                    N_PLUS_ONE.labels(route_path, relationship).inc()
+                    logger.warning("Possible N+1: %s lazy loaded %s times in %s %s", relationship, count, scope['method'], route_path)
+            if request_profiler is not None:
+                profiler.stop(request_profiler, f"{scope['method']} {route_path}", elapsed)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from src.metrics.instrumentation import profiler
+
+router = APIRouter()
+
+@router.get("", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/slowest", response_class=PlainTextResponse, include_in_schema=False)
+def slowest_requests():
+    return profiler.dump()
@@ -0,0 +1,47 @@
+import threading
+from src.config import settings
+from src.database import SessionLocal
+from src.logging_config import logger
+from src.outbox.service import dispatch_pending
+from src.utils.smtp import smtp_connection
+
+class OutboxDispatcher:
+    """Background thread draining the email outbox over the shared SMTP connection."""
+
+    def __init__(self, connection=smtp_connection, poll_interval: float = settings.OUTBOX_POLL_INTERVAL_SECONDS):
+        self.connection = connection
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            return dispatch_pending(db, self.connection)
+        except Exception as e:
+            db.rollback()
+            logger.error("Outbox dispatch failed: %s", e)
+            return 0
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # A full batch means there is likely more waiting, so drain before sleeping
+            if self.run_once() < settings.OUTBOX_BATCH_SIZE:
+                self._stop.wait(self.poll_interval)
+        self.connection.close()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.poll_interval + settings.SMTP_TIMEOUT_SECONDS)
+            self._thread = None
+
+outbox_dispatcher = OutboxDispatcher()
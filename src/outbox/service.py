@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from src.config import settings
+from src.logging_config import logger
+from src.outbox import models
+
+PENDING = "pending"
+# Leased to a dispatcher until leased_until; an expired lease (the dispatcher died) is due again
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Adds the message to the caller's transaction, so it is only delivered if that commits
+def enqueue_email(db: Session, dedup_key: str, to_email: str, subject: str, body: str):
+    existing = db.query(models.EmailOutbox).filter(models.EmailOutbox.dedup_key == dedup_key).first()
+    if existing is not None:
+        if existing.status == FAILED:
+            existing.status = PENDING
+            existing.attempts = 0
+            existing.next_attempt_at = datetime.utcnow()
+        return existing
+    message = models.EmailOutbox(dedup_key=dedup_key, to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
+
+def get_retry_delay(attempts: int) -> timedelta:
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+def claim_due(db: Session, now: datetime) -> list:
+    """Lease one batch of due messages to the caller and commit, so no row lock is held while sending.
+
+    Returns (id, to_email, subject, body, attempts, leased_until) tuples.
+    """
+    Outbox = models.EmailOutbox
+    due = or_(
+        and_(Outbox.status == PENDING, Outbox.next_attempt_at <= now),
+        and_(Outbox.status == SENDING, Outbox.leased_until <= now),
+    )
+    messages = (
+        db.query(Outbox)
+        .filter(due)
+        .order_by(Outbox.next_attempt_at, Outbox.id)
+        .limit(settings.OUTBOX_BATCH_SIZE)
+        # Lets several workers claim at once without taking the same row
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    leased_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    claimed = []
+    for message in messages:
+        if message.status == SENDING and message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = FAILED
+            message.last_error = "Delivery lease expired"
+            logger.error("Giving up on outbox email %s after %s attempts: lease expired", message.id, message.attempts)
+            continue
+        message.status = SENDING
+        message.leased_until = leased_until
+        message.attempts += 1
+        claimed.append((message.id, message.to_email, message.subject, message.body, message.attempts, leased_until))
+    db.commit()
+    return claimed
+
+def finish_message(db: Session, message_id: int, leased_until: datetime, **values):
+    # Only while the lease is still ours; a reclaimed message belongs to the dispatcher that took it
+    Outbox = models.EmailOutbox
+    db.query(Outbox).filter(
+        Outbox.id == message_id, Outbox.status == SENDING, Outbox.leased_until == leased_until
+    ).update({**values, "leased_until": None}, synchronize_session=False)
+    db.commit()
+
+def dispatch_pending(db: Session, connection) -> int:
+    """Send one batch of due messages over `connection`; returns how many were claimed."""
+    now = datetime.utcnow()
+    claimed = claim_due(db, now)
+    for message_id, to_email, subject, body, attempts, leased_until in claimed:
+        try:
+            connection.send(to_email, subject, body)
+        except Exception as e:
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                finish_message(db, message_id, leased_until, status=FAILED, last_error=str(e))
+                logger.error("Giving up on outbox email %s after %s attempts: %s", message_id, attempts, e)
+            else:
+                retry_at = datetime.utcnow() + get_retry_delay(attempts)
+                finish_message(db, message_id, leased_until, status=PENDING, next_attempt_at=retry_at, last_error=str(e))
+                logger.warning("Outbox email %s failed, retrying: %s", message_id, e)
+            continue
+        finish_message(db, message_id, leased_until, status=SENT, sent_at=datetime.utcnow(), last_error=None)
+    return len(claimed)
@@ -0,0 +1,167 @@
+import asyncio
+import bisect
+import itertools
+import math
+from prometheus_client import Counter, Gauge
+from starlette.responses import JSONResponse
+from src.config import settings
+from src.logging_config import logger
+
+# Admission control in front of the app, per worker.
+#
+# Requests are classed by path. At most `capacity` of them run at once, which by default is what
+# the connection pool can serve (DB_POOL_SIZE + DB_MAX_OVERFLOW); bulk reads and transfers may
+# hold only part of it so they can't starve the rest. A request over its limit waits in a queue
+# ordered by class priority, then arrival, for up to ADMISSION_QUEUE_TIMEOUT_SECONDS. A full
+# queue makes room for a higher priority request by shedding its newest, lowest priority waiter.
+# Rejected requests get a 503 with Retry-After instead of waiting on a pool checkout until
+# DB_POOL_TIMEOUT, so latency for admitted requests stays bounded past saturation.
+
+CRITICAL, DEFAULT, BULK = "critical", "default", "bulk"
+PRIORITY = {CRITICAL: 0, DEFAULT: 1, BULK: 2}
+
+# Probes and scrapes never touch the database and are never queued
+EXEMPT_PATHS = ("/healthcheck/live", "/metrics")
+CRITICAL_PREFIXES = ("/auth", "/healthcheck")
+BULK_PATHS = ("/contacts/search/", "/contacts/birthdays/", "/contacts/import", "/contacts/export", "/contacts/batch", "/contacts/duplicates")
+
+ADMISSION_DECISIONS = Counter("admission_decisions_total", "Admission decisions per request class", ["request_class", "outcome"])
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests currently running", ["request_class"])
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for admission")
+
+def classify(method: str, path: str):
+    """Request class for a path, or None when it bypasses admission control."""
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(CRITICAL_PREFIXES):
+        return CRITICAL
+    if path.startswith(BULK_PATHS) or (method == "GET" and path.rstrip("/") == "/contacts"):
+        return BULK
+    return DEFAULT
+
+class Waiter:
+    def __init__(self, request_class: str, sequence: int):
+        self.request_class = request_class
+        self.key = (PRIORITY[request_class], sequence)
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+class AdmissionController:
+    def __init__(self, capacity: int, bulk_share: float, queue_size: int, timeout: float):
+        self.capacity = max(capacity, 1)
+        self.limits = {CRITICAL: self.capacity, DEFAULT: self.capacity, BULK: max(int(self.capacity * bulk_share), 1)}
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.in_flight = {request_class: 0 for request_class in PRIORITY}
+        self.waiters = []
+        self.sequence = itertools.count()
+
+    def has_room(self, request_class: str) -> bool:
+        return self.active < self.capacity and self.in_flight[request_class] < self.limits[request_class]
+
+    def take(self, request_class: str):
+        self.active += 1
+        self.in_flight[request_class] += 1
+        ADMISSION_IN_FLIGHT.labels(request_class).inc()
+
+    def release(self, request_class: str):
+        self.active -= 1
+        self.in_flight[request_class] -= 1
+        ADMISSION_IN_FLIGHT.labels(request_class).dec()
+        self.wake()
+
+    def wake(self):
+        # Slots are handed over to the waiters here, so a request arriving now can't take them first
+        index = 0
+        while index < len(self.waiters) and self.active < self.capacity:
+            waiter = self.waiters[index]
+            if self.has_room(waiter.request_class):
+                self.waiters.pop(index)
+                self.take(waiter.request_class)
+                waiter.future.set_result(True)
+            else:
+                index += 1
+        ADMISSION_QUEUED.set(len(self.waiters))
+
+    def remove(self, waiter: Waiter):
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+            ADMISSION_QUEUED.set(len(self.waiters))
+
+    async def acquire(self, request_class: str) -> bool:
+        """Wait for a slot; True once admitted, False when the request should be rejected."""
+        priority = PRIORITY[request_class]
+        ahead = any(waiter.key[0] <= priority for waiter in self.waiters)
+        if self.has_room(request_class) and not ahead:
+            self.take(request_class)
+            ADMISSION_DECISIONS.labels(request_class, "admitted").inc()
+            return True
+
+        if len(self.waiters) >= self.queue_size:
+            lowest = self.waiters[-1] if self.waiters else None
+            if lowest is None or lowest.key[0] <= priority:
+                ADMISSION_DECISIONS.labels(request_class, "rejected").inc()
+                return False
+            self.waiters.pop()
+            lowest.future.set_result(False)
+            ADMISSION_DECISIONS.labels(lowest.request_class, "shed").inc()
+
+        waiter = Waiter(request_class, next(self.sequence))
+        bisect.insort(self.waiters, waiter)
+        ADMISSION_QUEUED.set(len(self.waiters))
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot handed over in the meantime
+            if waiter.future.done() and waiter.future.result():
+                self.release(request_class)
+            else:
+                self.remove(waiter)
+            raise
+        if not waiter.future.done():
+            self.remove(waiter)
+            waiter.future.cancel()
+            ADMISSION_DECISIONS.labels(request_class, "timed_out").inc()
+            return False
+        if waiter.future.result():
+            ADMISSION_DECISIONS.labels(request_class, "queued").inc()
+            return True
+        return False
+
+def get_capacity() -> int:
+    return settings.ADMISSION_MAX_CONCURRENCY or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+class AdmissionControlMiddleware:
+    """ASGI middleware admitting HTTP requests through an AdmissionController."""
+
+    def __init__(self, app):
+        self.app = app
+        self.controller = AdmissionController(
+            get_capacity(),
+            settings.ADMISSION_BULK_SHARE,
+            settings.ADMISSION_QUEUE_SIZE,
+            settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        )
+        self.retry_after = str(max(math.ceil(settings.ADMISSION_QUEUE_TIMEOUT_SECONDS), 1))
+        logger.info("Admission control: %s concurrent requests, %s for bulk routes", self.controller.capacity, self.controller.limits[BULK])
+
+    async def __call__(self, scope, receive, send):
+        request_class = classify(scope.get("method", ""), scope["path"]) if scope["type"] == "http" else None
+        if request_class is None:
+            await self.app(scope, receive, send)
+            return
+        if not await self.controller.acquire(request_class):
+            response = JSONResponse(
+                {"detail": "Server is over capacity, retry later"},
+                status_code=503,
+                headers={"Retry-After": self.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(request_class)
@@ -0,0 +1,38 @@
+import io
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from src.config import settings
+from src.utils.storage import get_avatar_storage
+
+READ_CHUNK_SIZE = 64 * 1024
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    buffer = bytearray()
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar file is too large")
+    return bytes(buffer)
+
+def make_avatar_thumbnail(data: bytes) -> bytes:
+    # Imported on first use to keep Pillow out of worker startup
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    try:
+        image = Image.open(io.BytesIO(data))
+        # Refuse to decode huge canvases hidden in small compressed files
+        if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Avatar image dimensions are too large")
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
+    size = settings.AVATAR_SIZE
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    thumbnail.save(output, format="JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+# Decoding, resizing and storing all block, so each step runs in the threadpool
+async def store_avatar(user_id: int, file: UploadFile) -> str:
+    data = await read_upload(file, settings.AVATAR_MAX_UPLOAD_BYTES)
+    thumbnail = await run_in_threadpool(make_avatar_thumbnail, data)
+    return await run_in_threadpool(get_avatar_storage().save, user_id, thumbnail)
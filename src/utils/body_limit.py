@@ -0,0 +1,42 @@
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+# Multipart boundaries and part headers around an uploaded file
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+class BodySizeLimitMiddleware:
+    """Caps request bodies per path before the app spools them to memory or disk.
+
+    A declared Content-Length over the limit is answered with 413 without reading the body.
+    Chunked or understated bodies are counted as they are received, and the read that crosses
+    the limit raises a 413 HTTPException, which FastAPI passes through its body parsing.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": "Request body is too large"}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,15 +1,21 @@
 import cloudinary
 import cloudinary.uploader
-import cloudinary.api
 from src.config import settings
 
-# Configure Cloudinary with the provided credentials
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-    api_key=settings.CLOUDINARY_API_KEY,
-    api_secret=settings.CLOUDINARY_API_SECRET
-)
+configured = False
+
+# Configure Cloudinary with the provided credentials on first upload rather than on import
+def configure_cloudinary():
+    global configured
+    if not configured:
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET
+        )
+        configured = True
 
 def upload_avatar(file):
+    configure_cloudinary()
     result = cloudinary.uploader.upload(file, folder="avatars")
     return result['secure_url']
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from src.config import settings
+from src.logging_config import logger
+from src.utils.redis_client import get_redis
+
+# Rate limiting with in-process token buckets reconciled with Redis.
+#
+# Each (rule, identity) pair has a local token bucket, so most requests are decided without any
+# network round trip. What a bucket grants is also queued as pending usage and pushed to a
+# sliding-window counter in Redis, shared by all workers, through an atomic Lua script. That
+# happens every RATE_LIMIT_SYNC_SECONDS, or sooner once pending usage reaches
+# RATE_LIMIT_SYNC_FRACTION of the limit, so tight limits such as login throttling sync on every
+# request. The global estimate returned by Redis then caps the local bucket. When Redis is
+# unreachable the limiter runs local-only, enforcing each limit per worker, and retries Redis
+# after RATE_LIMIT_REDIS_RETRY_SECONDS.
+
+# KEYS: current window, previous window. ARGV: weight, window length in ms, ms into the current window.
+SLIDING_WINDOW_SCRIPT = """
+local weight = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current
+if weight > 0 then
+    current = redis.call("INCRBY", KEYS[1], weight)
+    redis.call("PEXPIRE", KEYS[1], window * 2)
+else
+    current = tonumber(redis.call("GET", KEYS[1]) or "0")
+end
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+return math.floor(previous * (window - elapsed) / window + current)
+"""
+
+class Rule:
+    def __init__(self, name: str, spec: str):
+        times, seconds = spec.split("/")
+        self.name = name
+        self.times = int(times)
+        self.seconds = float(seconds)
+        self.rate = self.times / self.seconds
+
+class Bucket:
+    def __init__(self, capacity: int):
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.pending = 0
+        self.last_sync = 0.0
+
+def too_many_requests(retry_after: float):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too Many Requests",
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+class RateLimiter:
+    def __init__(self, rules: dict):
+        self.rules = {name: Rule(name, spec) for name, spec in rules.items()}
+        self.buckets = OrderedDict()
+        self.degraded_until = 0.0
+        self._script = None
+
+    def get_bucket(self, rule: Rule, identity: str) -> Bucket:
+        key = (rule.name, identity)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(rule.times)
+            # Bounded so a flood of distinct IPs can't grow memory without limit
+            while len(self.buckets) > settings.RATE_LIMIT_MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    async def hit(self, rule_name: str, identity: str, weight: int = 1):
+        """Consume `weight` units of `rule_name` for `identity`; raises a 429 when over the limit.
+
+        Rules missing from RATE_LIMITS are not limited.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        rule = self.rules.get(rule_name)
+        if rule is None:
+            return
+        bucket = self.get_bucket(rule, identity)
+        now = time.monotonic()
+        bucket.tokens = min(rule.times, bucket.tokens + (now - bucket.updated) * rule.rate)
+        bucket.updated = now
+        if bucket.tokens < weight:
+            raise too_many_requests((weight - bucket.tokens) / rule.rate)
+        bucket.tokens -= weight
+        bucket.pending += weight
+
+        due = now - bucket.last_sync >= settings.RATE_LIMIT_SYNC_SECONDS or bucket.pending >= rule.times * settings.RATE_LIMIT_SYNC_FRACTION
+        if not due or now < self.degraded_until:
+            return
+        used = await self.sync(rule, identity, bucket)
+        if used is not None and used > rule.times:
+            raise too_many_requests(rule.seconds * (used - rule.times) / rule.times)
+
+    async def sync(self, rule: Rule, identity: str, bucket: Bucket):
+        """Push pending usage to Redis; returns the global usage estimate, or None in local-only mode."""
+        pending, bucket.pending = bucket.pending, 0
+        bucket.last_sync = time.monotonic()
+        window_ms = int(rule.seconds * 1000)
+        now_ms = int(time.time() * 1000)
+        window = now_ms // window_ms
+        prefix = f"ratelimit:{rule.name}:{identity}"
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(SLIDING_WINDOW_SCRIPT)
+            used = await asyncio.wait_for(
+                self._script(keys=[f"{prefix}:{window}", f"{prefix}:{window - 1}"], args=[pending, window_ms, now_ms % window_ms]),
+                timeout=settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            bucket.pending += pending
+            self.degraded_until = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+            logger.warning("Rate limiter falling back to local-only mode: %s", str(e) or type(e).__name__)
+            return None
+        used = int(used)
+        # Other workers' usage leaves less room in this one
+        bucket.tokens = min(bucket.tokens, max(rule.times - used, 0))
+        return used
+
+rate_limiter = RateLimiter(settings.RATE_LIMITS)
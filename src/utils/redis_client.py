@@ -0,0 +1,11 @@
+from redis import asyncio as aioredis
+from src.config import settings
+
+redis_client = None
+
+# Shared asyncio Redis client; the connection pool is opened lazily on first command
+def get_redis():
+    global redis_client
+    if redis_client is None:
+        redis_client = aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    return redis_client
@@ -0,0 +1,56 @@
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from src.config import settings
+from src.logging_config import logger
+
+class SMTPConnection:
+    """A persistent SMTP session, reconnected on demand and closed after being idle."""
+
+    def __init__(self):
+        self._server = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if settings.SMTP_STARTTLS:
+            server.starttls()
+        if settings.SMTP_USERNAME:
+            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return server
+
+    def _get_server(self):
+        if self._server is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_TIMEOUT_SECONDS:
+            self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, to_email: str, subject: str, body: str):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = settings.EMAIL_FROM
+        msg['To'] = to_email
+        with self._lock:
+            try:
+                self._get_server().sendmail(settings.EMAIL_FROM, [to_email], msg.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped the idle session, retry once on a fresh one
+                self.close()
+                self._get_server().sendmail(settings.EMAIL_FROM, [to_email], msg.as_string())
+            self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except smtplib.SMTPException as e:
+            logger.warning("Error closing SMTP connection: %s", e)
+        except OSError:
+            pass
+        self._server = None
+
+smtp_connection = SMTPConnection()
@@ -0,0 +1,56 @@
+import hashlib
+import io
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from src.config import settings
+
+class AvatarStorage(ABC):
+    """Where processed avatars are stored. save() blocks and must run off the event loop."""
+
+    @abstractmethod
+    def save(self, user_id: int, data: bytes) -> str:
+        """Stores the avatar and returns its public URL."""
+
+class CloudinaryStorage(AvatarStorage):
+    def save(self, user_id: int, data: bytes) -> str:
+        from src.utils.cloudinary import upload_avatar
+        return upload_avatar(io.BytesIO(data))
+
+class LocalStorage(AvatarStorage):
+    """Writes avatars to AVATAR_LOCAL_DIR, served by the app under AVATAR_LOCAL_URL_PATH."""
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, user_id: int, data: bytes) -> str:
+        # Content-addressed names so a new avatar never hits a stale browser cache
+        filename = f"{user_id}-{hashlib.sha256(data).hexdigest()[:16]}.jpg"
+        path = os.path.join(self.directory, filename)
+        # A temporary file per call: concurrent uploads of the same image share the final name
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{filename}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # mkstemp creates the file private, avatars are public
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return f"{self.base_url}/{filename}"
+
+avatar_storage = None
+
+def get_avatar_storage() -> AvatarStorage:
+    global avatar_storage
+    if avatar_storage is None:
+        if settings.AVATAR_STORAGE_BACKEND == "local":
+            avatar_storage = LocalStorage(settings.AVATAR_LOCAL_DIR, settings.AVATAR_LOCAL_URL_PATH)
+        elif settings.AVATAR_STORAGE_BACKEND == "cloudinary":
+            avatar_storage = CloudinaryStorage()
+        else:
+            raise ValueError(f"Unknown avatar storage backend '{settings.AVATAR_STORAGE_BACKEND}'")
+    return avatar_storage
@@ -0,0 +1,113 @@
+"""Shared fixtures: the app on a throwaway SQLite database, in sync or async mode, and fakeredis.
+
+Settings are read when src is imported, so the environment is set up before anything from src.
+DATABASE_ASYNC is on, so both engines exist; the `client` fixture switches the app to the sync
+mode per test by overriding get_db, the same way DATABASE_ASYNC=false would select it.
+"""
+import os
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="contacts-tests-")
+
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'tests.sqlite3')}",
+    "DATABASE_ASYNC": "true",
+    "SECRET_KEY": "test-secret", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "SECURITY_PASSWORD_SALT": "test-salt", "EMAIL_FROM": "tests@example.com",
+    "SMTP_SERVER": "localhost", "SMTP_PORT": "8025", "SMTP_USERNAME": "", "SMTP_PASSWORD": "",
+    "SMTP_STARTTLS": "false", "CLOUDINARY_CLOUD_NAME": "test", "CLOUDINARY_API_KEY": "test",
+    "CLOUDINARY_API_SECRET": "test",
+    "AVATAR_STORAGE_BACKEND": "local", "AVATAR_LOCAL_DIR": os.path.join(WORKDIR, "avatars"),
+    "OUTBOX_ENABLED": "false", "RATE_LIMIT_ENABLED": "false", "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from fakeredis import aioredis as fake_aioredis
+
+TEST_PASSWORD = "test-password"
+
+def contact_payload(n: int = 0, **overrides) -> dict:
+    """A valid ContactCreate body; `n` keeps the email unique."""
+    return {
+        "first_name": "Ivan", "last_name": f"Koval{n}", "email": f"contact-{n}@example.com",
+        "phone": "+380671234567", "birthday": "1990-05-17", **overrides,
+    }
+
+async def create_contact(client, user, n: int = 0, **overrides) -> int:
+    """Creates a contact through the API as `user`; returns its id."""
+    response = await client.post("/contacts/", json=contact_payload(n, **overrides), headers=user.headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    from src.utils import redis_client
+    client = fake_aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+    monkeypatch.setattr(redis_client, "redis_client", client)
+    return client
+
+class BrokenRedis:
+    """Every command fails, like a Redis that is down."""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            from redis.exceptions import ConnectionError
+            raise ConnectionError("Redis is down")
+        return fail
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    from src.utils import redis_client
+    monkeypatch.setattr(redis_client, "redis_client", BrokenRedis())
+
+@pytest.fixture
+def app():
+    from src.main import app
+    from src.database import Base, engine
+    from src.auth.cache import user_cache
+    Base.metadata.create_all(bind=engine)
+    yield app
+    app.dependency_overrides.clear()
+    user_cache._local.clear()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(params=["sync", "async"])
+def db_mode(request, monkeypatch):
+    from src.config import settings
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", request.param == "async")
+    return request.param
+
+@pytest.fixture
+async def client(app, db_mode):
+    import httpx
+    from src.database import async_engine, get_async_db, get_sync_db
+    if db_mode == "sync":
+        app.dependency_overrides[get_async_db] = get_sync_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+
+@pytest.fixture
+def user(app):
+    """A verified user; `user.headers` authenticates as them."""
+    from src.database import SessionLocal
+    from src.auth.models import User
+    from src.auth.utils import create_access_token, get_password_hash
+    db = SessionLocal()
+    try:
+        user = User(email="user@example.com", username="user", hashed_password=get_password_hash(TEST_PASSWORD), is_verified=True)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+    finally:
+        db.close()
+    user.headers = {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+    return user
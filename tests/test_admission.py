@@ -0,0 +1,81 @@
+import asyncio
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+from src.config import settings
+from src.utils.admission import AdmissionControlMiddleware
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def middleware(monkeypatch):
+    """Admission control with one slot and one queue place around an app whose /slow waits for `release`."""
+    monkeypatch.setattr(settings, "ADMISSION_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 5)
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/boom":
+            raise RuntimeError("handler failed")
+        if scope["path"] == "/slow":
+            await release.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    middleware = AdmissionControlMiddleware(app)
+    middleware.release = release
+    return middleware
+
+@pytest.fixture
+async def client(middleware):
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+async def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+async def test_full_queue_is_rejected_with_retry_after(client, middleware):
+    controller = middleware.controller
+    running = asyncio.create_task(client.get("/slow"))
+    await wait_until(lambda: controller.active == 1)
+    queued = asyncio.create_task(client.get("/contacts/1"))
+    await wait_until(lambda: len(controller.waiters) == 1)
+
+    response = await client.get("/contacts/2")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+    middleware.release.set()
+    assert (await running).status_code == 200
+    assert (await queued).status_code == 200
+    assert controller.active == 0
+
+@pytest.mark.parametrize("path", ["/healthcheck/live", "/metrics"])
+async def test_exempt_paths_skip_a_full_queue(client, middleware, path):
+    controller = middleware.controller
+    running = asyncio.create_task(client.get("/slow"))
+    await wait_until(lambda: controller.active == 1)
+    queued = asyncio.create_task(client.get("/contacts/1"))
+    await wait_until(lambda: len(controller.waiters) == 1)
+
+    assert (await client.get(path)).status_code == 200
+    middleware.release.set()
+    await asyncio.gather(running, queued)
+
+async def test_slot_is_released_when_the_handler_raises(middleware):
+    controller = middleware.controller
+    transport = httpx.ASGITransport(app=middleware, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/boom")).status_code == 500
+    assert controller.active == 0
+    assert all(count == 0 for count in controller.in_flight.values())
+    # The one slot is free again
+    middleware.release.set()
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/slow")).status_code == 200
@@ -0,0 +1,55 @@
+import asyncio
+import io
+import pytest
+from PIL import Image
+from src.config import settings
+from src.utils.storage import AvatarStorage
+
+pytestmark = pytest.mark.anyio
+
+def png(size=(512, 512)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 200)).save(output, format="PNG")
+    return output.getvalue()
+
+async def upload(client, user, data: bytes):
+    return await client.post("/auth/upload-avatar", files={"file": ("avatar.png", data, "image/png")}, headers=user.headers)
+
+async def test_concurrent_uploads_of_one_image(client, user):
+    data = png()
+    responses = await asyncio.gather(*(upload(client, user, data) for _ in range(8)))
+    assert [response.status_code for response in responses] == [200] * 8
+    assert len({response.json()["avatar_url"] for response in responses}) == 1
+
+async def test_declared_oversized_body_is_refused_unread(client, user):
+    received = 0
+
+    async def body():
+        nonlocal received
+        for _ in range(8):
+            received += 1
+            yield b"x" * 1024 * 1024
+
+    headers = {**user.headers, "Content-Type": "multipart/form-data; boundary=x", "Content-Length": str(8 * 1024 * 1024)}
+    response = await client.post("/auth/upload-avatar", content=body(), headers=headers)
+    assert response.status_code == 413
+    assert received <= 1
+
+async def test_streamed_oversized_body_is_cut_off(client, user):
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        yield b"--x\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\nContent-Type: image/png\r\n\r\n"
+        while sent < 3 * settings.AVATAR_MAX_UPLOAD_BYTES:
+            sent += 64 * 1024
+            yield b"x" * 64 * 1024
+
+    headers = {**user.headers, "Content-Type": "multipart/form-data; boundary=x"}
+    response = await client.post("/auth/upload-avatar", content=body(), headers=headers)
+    assert response.status_code == 413
+    assert sent < 2 * settings.AVATAR_MAX_UPLOAD_BYTES
+
+def test_storage_backends_must_implement_save():
+    with pytest.raises(TypeError):
+        AvatarStorage()
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from conftest import contact_payload, create_contact
+from src.auth.models import User
+from src.contacts import batch
+from src.contacts.models import Contact
+from src.database import SessionLocal
+
+pytestmark = pytest.mark.anyio
+
+async def post_batch(client, user, operations: list) -> list:
+    response = await client.post("/contacts/batch", json={"operations": operations}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    return [(result["status"], result["id"]) for result in response.json()["results"]]
+
+def contacts_version(user_id: int) -> int:
+    with SessionLocal() as db:
+        return db.get(User, user_id).contacts_version
+
+async def test_each_operation_gets_its_own_status(client, user):
+    existing = await create_contact(client, user, 0)
+    deleted = await create_contact(client, user, 1)
+    results = await post_batch(client, user, [
+        {"op": "create", "contact": contact_payload(2)},
+        # Same email as `existing`
+        {"op": "create", "contact": contact_payload(0)},
+        {"op": "update", "id": existing, "contact": contact_payload(0, last_name="Melnyk")},
+        {"op": "update", "id": existing + 1000, "contact": contact_payload(3)},
+        {"op": "delete", "id": deleted},
+        {"op": "delete", "id": deleted},
+        {"op": "create"},
+    ])
+    created = results[0][1]
+    assert results == [(201, created), (409, None), (200, existing), (404, existing + 1000), (200, deleted), (422, deleted), (422, None)]
+    assert (await client.get(f"/contacts/{created}", headers=user.headers)).status_code == 200
+    assert (await client.get(f"/contacts/{existing}", headers=user.headers)).json()["last_name"] == "Melnyk"
+    assert (await client.get(f"/contacts/{deleted}", headers=user.headers)).status_code == 404
+
+async def test_contacts_of_other_users_are_not_found(client, user):
+    with SessionLocal() as db:
+        other = User(email="other@example.com", username="other", hashed_password="x", is_verified=True)
+        db.add(other)
+        db.commit()
+        other_id = other.id
+    with SessionLocal() as db:
+        foreign = Contact(user_id=other_id, first_name="Olena", last_name="Boyko", email="olena@example.com", change_version=1)
+        db.add(foreign)
+        db.commit()
+        foreign_id = foreign.id
+    results = await post_batch(client, user, [{"op": "delete", "id": foreign_id}, {"op": "update", "id": foreign_id, "contact": contact_payload(1)}])
+    # The first mention is looked up, the repeat is rejected before that
+    assert results == [(404, foreign_id), (422, foreign_id)]
+    with SessionLocal() as db:
+        assert db.get(Contact, foreign_id) is not None
+
+def test_conflicting_bulk_statement_is_retried_item_by_item(app):
+    calls = []
+    def execute(items):
+        calls.append(len(items))
+        if "bad" in items:
+            raise IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
+        return [f"{item}-done" for item in items]
+    with SessionLocal() as db:
+        outcomes = batch.run_bulk(db, ["a", "bad", "b"], execute)
+    # One bulk attempt, then one savepoint per item
+    assert calls == [3, 1, 1, 1]
+    assert [(item, outcome if isinstance(outcome, str) else "error") for item, outcome in outcomes] == [("a", "a-done"), ("bad", "error"), ("b", "b-done")]
+
+async def test_batch_writes_share_one_change_version(client, user):
+    updated = await create_contact(client, user, 0)
+    deleted = await create_contact(client, user, 1)
+    token = (await client.get("/contacts/changes", headers=user.headers)).json()["next_token"]
+    version = contacts_version(user.id)
+
+    results = await post_batch(client, user, [
+        {"op": "create", "contact": contact_payload(2)},
+        {"op": "create", "contact": contact_payload(3)},
+        {"op": "update", "id": updated, "contact": contact_payload(0, last_name="Melnyk")},
+        {"op": "delete", "id": deleted},
+    ])
+    assert [status for status, _ in results] == [201, 201, 200, 200]
+    assert contacts_version(user.id) == version + 1
+    changes = (await client.get("/contacts/changes", params={"since": token}, headers=user.headers)).json()["changes"]
+    assert len(changes) == 4
+    assert {change["version"] for change in changes} == {version + 1}
+
+async def test_batch_without_writes_keeps_the_version(client, user):
+    version = contacts_version(user.id)
+    assert await post_batch(client, user, [{"op": "delete", "id": 1000}]) == [(404, 1000)]
+    assert contacts_version(user.id) == version
@@ -0,0 +1,63 @@
+from datetime import date
+import pytest
+from sqlalchemy import event
+from conftest import create_contact
+from src.contacts import service
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def today(monkeypatch):
+    """Sets the date the birthday window starts from."""
+    def set_today(value: date):
+        class FrozenDate(date):
+            @classmethod
+            def today(cls):
+                return value
+        monkeypatch.setattr(service, "date", FrozenDate)
+    return set_today
+
+async def upcoming(client, user, birthdays, days: int) -> list:
+    for n, birthday in enumerate(birthdays):
+        await create_contact(client, user, n, birthday=birthday)
+    response = await client.get("/contacts/birthdays/", params={"days": days}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    return [contact["birthday"] for contact in response.json()]
+
+async def test_window_matches_month_and_day_of_any_year(client, user, today):
+    today(date(2026, 6, 10))
+    birthdays = ["1990-06-09", "1985-06-17", "2001-06-10", "1979-06-18", "1990-07-10"]
+    assert await upcoming(client, user, birthdays, 7) == ["2001-06-10", "1985-06-17"]
+
+async def test_window_wraps_into_january(client, user, today):
+    today(date(2026, 12, 28))
+    birthdays = ["1990-01-03", "1990-12-27", "1985-12-30", "1979-01-05"]
+    assert await upcoming(client, user, birthdays, 7) == ["1985-12-30", "1990-01-03"]
+
+@pytest.mark.parametrize("current, days", [(date(2027, 2, 25), 7), (date(2028, 2, 28), 1), (date(2028, 2, 29), 0)])
+async def test_february_29_birthday(client, user, today, current, days):
+    today(current)
+    assert await upcoming(client, user, ["2000-02-29", "1990-03-05"], days) == ["2000-02-29"]
+
+async def test_whole_year_starts_from_today(client, user, today):
+    today(date(2026, 6, 10))
+    birthdays = ["1990-01-05", "1990-06-09", "1990-06-10", "1990-12-31"]
+    assert await upcoming(client, user, birthdays, 365) == ["1990-06-10", "1990-12-31", "1990-01-05", "1990-06-09"]
+
+@pytest.mark.parametrize("current", [date(2026, 6, 10), date(2026, 12, 28)])
+def test_window_is_served_from_the_index(app, user, today, current):
+    from src.database import SessionLocal, engine
+    today(current)
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with SessionLocal() as db:
+            service.get_contacts_with_upcoming_birthdays(db, user.id, days=7)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    statement, parameters = statements[-1]
+    with engine.connect() as connection:
+        plan = " ".join(str(row) for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert "USING INDEX ix_contacts_owner_birthday_key" in plan, plan
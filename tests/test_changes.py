@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import pytest
+from conftest import create_contact
+from src.auth.models import User
+from src.contacts import changes, models
+from src.database import SessionLocal
+
+pytestmark = pytest.mark.anyio
+
+async def delete_contact(client, user, contact_id: int):
+    response = await client.delete(f"/contacts/{contact_id}", headers=user.headers)
+    assert response.status_code == 200, response.text
+
+async def sync(client, user, since=None):
+    response = await client.get("/contacts/changes", params={"since": since} if since else {}, headers=user.headers)
+    return response
+
+def age_tombstones(days: int):
+    with SessionLocal() as db:
+        db.query(models.ContactTombstone).update({"deleted_at": datetime.utcnow() - timedelta(days=days)})
+        db.commit()
+
+def prune(days: int = 30) -> int:
+    with SessionLocal() as db:
+        return changes.prune_tombstones(db, datetime.utcnow() - timedelta(days=days))
+
+async def test_deletions_reach_the_feed(client, user):
+    ids = [await create_contact(client, user, n) for n in range(2)]
+    token = (await sync(client, user)).json()["next_token"]
+    await delete_contact(client, user, ids[0])
+    response = await sync(client, user, token)
+    assert response.status_code == 200
+    assert [(change["op"], change["id"]) for change in response.json()["changes"]] == [("delete", ids[0])]
+
+async def test_recent_tombstones_are_kept(client, user):
+    contact_id = await create_contact(client, user, 0)
+    await delete_contact(client, user, contact_id)
+    assert prune() == 0
+    with SessionLocal() as db:
+        assert db.query(models.ContactTombstone).count() == 1
+
+async def test_token_from_before_pruned_deletions_is_gone(client, user):
+    ids = [await create_contact(client, user, n) for n in range(3)]
+    old_token = (await sync(client, user)).json()["next_token"]
+    await delete_contact(client, user, ids[0])
+    age_tombstones(31)
+    # A client that synced after the deletion keeps working
+    current_token = (await sync(client, user, old_token)).json()["next_token"]
+
+    assert prune() == 1
+    with SessionLocal() as db:
+        assert db.query(models.ContactTombstone).count() == 0
+        assert db.get(User, user.id).contacts_pruned_version == db.get(User, user.id).contacts_version
+
+    response = await sync(client, user, old_token)
+    assert response.status_code == 410
+    assert (await sync(client, user, current_token)).json()["changes"] == []
+    # Starting over without a token returns the whole book
+    full = await sync(client, user)
+    assert full.status_code == 200
+    assert sorted(change["id"] for change in full.json()["changes"]) == ids[1:]
+
+async def test_later_deletions_survive_pruning(client, user):
+    ids = [await create_contact(client, user, n) for n in range(3)]
+    token = (await sync(client, user)).json()["next_token"]
+    await delete_contact(client, user, ids[0])
+    age_tombstones(31)
+    mid_token = (await sync(client, user, token)).json()["next_token"]
+    await delete_contact(client, user, ids[1])
+
+    assert prune() == 1
+    response = await sync(client, user, mid_token)
+    assert response.status_code == 200
+    assert [(change["op"], change["id"]) for change in response.json()["changes"]] == [("delete", ids[1])]
+
+@pytest.mark.parametrize("values", [[True, None], [1.5, None], [1, False], ["1", None], [1]])
+async def test_malformed_token_is_rejected(client, user, values):
+    from src.contacts.pagination import encode_cursor
+    await create_contact(client, user, 0)
+    response = await sync(client, user, encode_cursor(*values))
+    assert response.status_code == 400, response.text
@@ -0,0 +1,20 @@
+import json
+import pytest
+from pydantic import ValidationError
+from src.config import DEFAULT_RATE_LIMITS, Settings
+
+def test_rate_limit_override_keeps_the_other_rules(monkeypatch):
+    monkeypatch.setenv("RATE_LIMITS", json.dumps({"contacts:create": "20/60", "contacts:export": "1/10"}))
+    limits = Settings().RATE_LIMITS
+    assert limits == {**DEFAULT_RATE_LIMITS, "contacts:create": "20/60", "contacts:export": "1/10"}
+    assert limits["auth:token:email"] == DEFAULT_RATE_LIMITS["auth:token:email"]
+
+def test_default_rate_limits(monkeypatch):
+    monkeypatch.delenv("RATE_LIMITS", raising=False)
+    assert Settings().RATE_LIMITS == DEFAULT_RATE_LIMITS
+
+@pytest.mark.parametrize("spec", ["20", "20/0", "0/60", "many/60", "20/minute"])
+def test_malformed_rate_limit_is_rejected(monkeypatch, spec):
+    monkeypatch.setenv("RATE_LIMITS", json.dumps({"contacts:create": spec}))
+    with pytest.raises(ValidationError, match="contacts:create"):
+        Settings()
@@ -0,0 +1,28 @@
+import pytest
+from conftest import create_contact
+from src.config import settings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(params=[False, True], ids=["no-response-cache", "response-cache"])
+def response_cache(request, monkeypatch):
+    monkeypatch.setattr(settings, "CONTACTS_RESPONSE_CACHE_ENABLED", request.param)
+
+async def test_unchanged_contacts_answer_304(client, user, response_cache):
+    await create_contact(client, user, 0)
+    first = await client.get("/contacts/", headers=user.headers)
+    assert first.status_code == 200
+    again = await client.get("/contacts/", headers={**user.headers, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+async def test_write_changes_the_etag_while_redis_is_down(client, user, response_cache, request):
+    await create_contact(client, user, 0)
+    first = await client.get("/contacts/", headers=user.headers)
+
+    request.getfixturevalue("redis_down")
+    await create_contact(client, user, 1)
+    second = await client.get("/contacts/", headers={**user.headers, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert [contact["last_name"] for contact in second.json()] == ["Koval0", "Koval1"]
@@ -0,0 +1,53 @@
+import threading
+import pytest
+from conftest import create_contact
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from src.database import get_async_db, get_sync_db, run_db
+
+pytestmark = pytest.mark.anyio
+
+def current_thread(db: Session):
+    assert isinstance(db, Session)
+    db.execute(text("SELECT 1"))
+    return threading.get_ident()
+
+async def test_get_sync_db_yields_session(app):
+    dependency = get_sync_db()
+    db = next(dependency)
+    try:
+        assert isinstance(db, Session)
+        # Sync service functions run in the threadpool, off the event loop's thread
+        assert await run_db(db, current_thread) != threading.get_ident()
+    finally:
+        dependency.close()
+
+async def test_get_async_db_yields_async_session(app):
+    from src.database import async_engine
+    dependency = get_async_db()
+    db = await dependency.__anext__()
+    try:
+        assert isinstance(db, AsyncSession)
+        # run_sync hands the service function the sync facade of the AsyncSession
+        assert await run_db(db, current_thread) == threading.get_ident()
+    finally:
+        await dependency.aclose()
+        await async_engine.dispose()
+
+async def test_contacts_round_trip(client, user):
+    contact_id = await create_contact(client, user)
+
+    response = await client.get("/contacts/", headers=user.headers)
+    assert response.status_code == 200, response.text
+    assert [contact["id"] for contact in response.json()] == [contact_id]
+
+    response = await client.patch(f"/contacts/{contact_id}", json={"phone": "+380501112233"}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["phone"] == "+380501112233"
+    assert response.json()["first_name"] == "Ivan"
+
+    response = await client.delete(f"/contacts/{contact_id}", headers=user.headers)
+    assert response.status_code == 200, response.text
+    response = await client.get(f"/contacts/{contact_id}", headers=user.headers)
+    assert response.status_code == 404
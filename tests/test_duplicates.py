@@ -0,0 +1,96 @@
+import threading
+import pytest
+from conftest import create_contact
+from src.auth.models import User
+from src.contacts import duplicates
+from src.contacts.models import Contact
+from src.database import SessionLocal
+
+pytestmark = pytest.mark.anyio
+
+CONTACTS = [
+    {"first_name": "Ivan", "last_name": "Koval", "email": "ivan.koval@gmail.com", "phone": "+380671234567", "birthday": "1990-05-17"},
+    {"first_name": "Ivan", "last_name": "Kovl", "email": "IvanKoval+work@gmail.com", "phone": "067 123 45 67", "birthday": "1990-05-17"},
+    {"first_name": "Olena", "last_name": "Shevchenko", "email": "olena@example.com", "phone": "+380501112233", "birthday": "1985-01-02"},
+]
+
+async def test_duplicates_are_clustered_off_the_event_loop(client, user, monkeypatch):
+    for n, contact in enumerate(CONTACTS):
+        await create_contact(client, user, n, **contact)
+
+    threads = []
+    cluster_duplicates = duplicates.cluster_duplicates
+    def recording(rows):
+        threads.append(threading.get_ident())
+        return cluster_duplicates(rows)
+    monkeypatch.setattr(duplicates, "cluster_duplicates", recording)
+
+    response = await client.get("/contacts/duplicates", headers=user.headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["scanned"] == 3
+    assert [cluster["reasons"] for cluster in result["clusters"]] == [["email", "name", "phone"]]
+    assert [contact["last_name"] for contact in result["clusters"][0]["contacts"]] == ["Koval", "Kovl"]
+    assert threads and threading.get_ident() not in threads
+
+def contacts_version(user_id: int) -> int:
+    with SessionLocal() as db:
+        return db.get(User, user_id).contacts_version
+
+async def merge(client, user, primary_id: int, duplicate_ids: list):
+    return await client.post("/contacts/duplicates/merge", json={"primary_id": primary_id, "duplicate_ids": duplicate_ids}, headers=user.headers)
+
+async def test_merge_fills_the_primary_and_tombstones_the_rest(client, user):
+    primary = await create_contact(client, user, 0, **{**CONTACTS[0], "phone": ""}, additional_info="met at work")
+    first = await create_contact(client, user, 1, **CONTACTS[1], additional_info="prefers calls")
+    second = await create_contact(client, user, 2, **{**CONTACTS[1], "email": "ivan@example.com", "phone": "+380990000000"}, additional_info="met at work")
+    kept = await create_contact(client, user, 3, **CONTACTS[2])
+    token = (await client.get("/contacts/changes", headers=user.headers)).json()["next_token"]
+    version = contacts_version(user.id)
+
+    response = await merge(client, user, primary, [second, first])
+    assert response.status_code == 200, response.text
+    merged = response.json()
+    assert (merged["id"], merged["first_name"], merged["last_name"], merged["email"]) == (primary, "Ivan", "Koval", "ivan.koval@gmail.com")
+    # Empty fields come from the duplicates in id order, notes from all of them without repeats
+    assert merged["phone"] == CONTACTS[1]["phone"]
+    assert merged["additional_info"] == "met at work\nprefers calls"
+    assert contacts_version(user.id) == version + 1
+
+    for contact_id in (first, second):
+        assert (await client.get(f"/contacts/{contact_id}", headers=user.headers)).status_code == 404
+    assert (await client.get(f"/contacts/{kept}", headers=user.headers)).status_code == 200
+    changes = (await client.get("/contacts/changes", params={"since": token}, headers=user.headers)).json()["changes"]
+    assert sorted((change["op"], change["id"]) for change in changes) == [("delete", first), ("delete", second), ("upsert", primary)]
+
+async def test_merge_rejects_foreign_and_missing_contacts(client, user):
+    with SessionLocal() as db:
+        other = User(email="other@example.com", username="other", hashed_password="x", is_verified=True)
+        db.add(other)
+        db.commit()
+        other_id = other.id
+    primary = await create_contact(client, user, 0, **CONTACTS[0])
+    duplicate = await create_contact(client, user, 1, **CONTACTS[1])
+    version = contacts_version(user.id)
+    with SessionLocal() as db:
+        foreign = Contact(user_id=other_id, first_name="Ivan", last_name="Koval", email="other-ivan@example.com", change_version=1)
+        db.add(foreign)
+        db.commit()
+        foreign_id = foreign.id
+
+    assert (await merge(client, user, primary, [duplicate, foreign_id])).status_code == 404
+    assert (await merge(client, user, foreign_id, [duplicate])).status_code == 404
+    assert (await merge(client, user, primary, [duplicate + 1000])).status_code == 404
+    # Nothing was changed by the failed merges
+    assert (await client.get(f"/contacts/{duplicate}", headers=user.headers)).status_code == 200
+    assert contacts_version(user.id) == version
+
+async def test_merge_rejects_repeated_ids(client, user):
+    primary = await create_contact(client, user, 0, **CONTACTS[0])
+    duplicate = await create_contact(client, user, 1, **CONTACTS[1])
+    assert (await merge(client, user, primary, [primary])).status_code == 422
+    assert (await merge(client, user, primary, [])).status_code == 422
+    # Repeats of a duplicate are merged once
+    response = await merge(client, user, primary, [duplicate, duplicate, primary])
+    assert response.status_code == 200, response.text
+    assert (await client.get(f"/contacts/{duplicate}", headers=user.headers)).status_code == 404
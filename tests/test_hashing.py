@@ -0,0 +1,50 @@
+import multiprocessing
+import pytest
+from conftest import TEST_PASSWORD
+from src.auth import hashing
+from src.auth.models import User
+from src.config import settings
+from src.database import SessionLocal
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def executor():
+    await hashing.start_executor()
+    yield hashing.executor
+    hashing.shutdown_executor()
+
+async def test_pool_is_started_without_forking_the_app(executor):
+    assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    # Workers exist before the first login
+    assert executor._processes
+
+async def test_hash_and_verify(executor):
+    hashed = await hashing.hash_password("secret")
+    assert await hashing.verify_password("secret", hashed) == (True, None)
+    verified, _ = await hashing.verify_password("wrong", hashed)
+    assert verified is False
+
+async def login(client, user):
+    return await client.post("/auth/token", data={"username": user.email, "password": TEST_PASSWORD})
+
+async def test_saturated_pool_rejects_logins(client, user, monkeypatch):
+    monkeypatch.setattr(hashing, "pending_jobs", settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE)
+    response = await login(client, user)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+async def test_login_rehashes_below_bcrypt_rounds(client, user, monkeypatch):
+    # `user` was hashed with 4 rounds; workers spawned now read BCRYPT_ROUNDS=5
+    hashing.shutdown_executor()
+    monkeypatch.setattr(hashing, "get_mp_context", lambda: multiprocessing.get_context("spawn"))
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    try:
+        response = await login(client, user)
+        assert response.status_code == 200, response.text
+    finally:
+        hashing.shutdown_executor()
+    with SessionLocal() as db:
+        hashed_password = db.get(User, user.id).hashed_password
+    assert hashed_password.startswith("$2b$05$")
+    assert (await login(client, user)).status_code == 200
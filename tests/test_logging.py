@@ -0,0 +1,46 @@
+import json
+import logging
+import os
+import sys
+import pytest
+from src import logging_config
+from src.logging_config import JsonFormatter, SamplingFilter
+
+def make_record(name: str = "contacts", level: int = logging.INFO, msg: str = "hello %s", args=("world",), exc_info=None):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, exc_info)
+
+def test_json_formatter_writes_one_object_per_record():
+    entry = json.loads(JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S").format(make_record()))
+    assert entry.keys() == {"time", "level", "logger", "message"}
+    assert (entry["level"], entry["logger"], entry["message"]) == ("INFO", "contacts", "hello world")
+
+def test_json_formatter_includes_the_exception():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(level=logging.ERROR, exc_info=sys.exc_info())
+    line = JsonFormatter().format(record)
+    assert "\n" not in line
+    assert "ValueError: boom" in json.loads(line)["exception"]
+
+@pytest.mark.parametrize("name, level, roll, kept", [
+    ("contacts.reads", logging.INFO, 0.5, False),
+    ("contacts.reads", logging.INFO, 0.05, True),
+    # Children inherit the rate of the closest configured parent
+    ("contacts.reads.search", logging.INFO, 0.5, False),
+    ("contacts.writes", logging.INFO, 0.99, True),
+    ("contacts.reads", logging.WARNING, 0.99, True),
+])
+def test_sampling_filter(monkeypatch, name, level, roll, kept):
+    monkeypatch.setattr(logging_config.random, "random", lambda: roll)
+    sampling = SamplingFilter({"contacts.reads": 0.1})
+    assert sampling.filter(make_record(name, level)) is kept
+
+def test_file_handler_is_per_process_when_configured(monkeypatch):
+    monkeypatch.setattr(logging_config.settings, "LOG_FILES_PER_PROCESS", True)
+    handler = logging_config.make_file_handler("app.log")
+    try:
+        assert os.path.basename(handler.baseFilename) == f"app.{os.getpid()}.log"
+    finally:
+        handler.close()
+        os.remove(handler.baseFilename)
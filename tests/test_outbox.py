@@ -0,0 +1,99 @@
+import socket
+from datetime import datetime, timedelta
+import pytest
+from aiosmtpd.controller import Controller
+from src.config import settings
+from src.database import SessionLocal
+from src.outbox import service
+from src.outbox.models import EmailOutbox
+from src.utils.smtp import SMTPConnection
+
+class Inbox:
+    """aiosmtpd handler keeping every delivered message."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 OK"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def inbox(monkeypatch):
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USERNAME", "")
+    yield inbox
+    controller.stop()
+
+@pytest.fixture
+def connection():
+    connection = SMTPConnection()
+    yield connection
+    connection.close()
+
+def enqueue(to_email: str, **fields) -> int:
+    with SessionLocal() as db:
+        message = service.enqueue_email(db, f"verify:{to_email}", to_email, "Verify your email", "Click the link")
+        for name, value in fields.items():
+            setattr(message, name, value)
+        db.commit()
+        return message.id
+
+def dispatch(connection) -> int:
+    with SessionLocal() as db:
+        return service.dispatch_pending(db, connection)
+
+def load(message_id: int) -> EmailOutbox:
+    with SessionLocal() as db:
+        return db.get(EmailOutbox, message_id)
+
+def test_delivers_pending_messages(app, inbox, connection):
+    ids = [enqueue(f"user-{n}@example.com") for n in range(3)]
+    assert dispatch(connection) == 3
+    assert sorted(rcpt for rcpt, _ in inbox.messages) == [[f"user-{n}@example.com"] for n in range(3)]
+    for message_id in ids:
+        message = load(message_id)
+        assert (message.status, message.attempts, message.leased_until) == (service.SENT, 1, None)
+    assert dispatch(connection) == 0
+
+def test_lease_is_committed_before_sending(app, inbox, connection):
+    message_id = enqueue("user@example.com")
+
+    class CheckingConnection:
+        def send(self, to_email, subject, body):
+            # Another dispatcher sees the lease and finds nothing to claim, without waiting on a lock
+            assert load(message_id).status == service.SENDING
+            with SessionLocal() as db:
+                assert service.claim_due(db, datetime.utcnow()) == []
+            connection.send(to_email, subject, body)
+
+    assert dispatch(CheckingConnection()) == 1
+    assert load(message_id).status == service.SENT
+    assert len(inbox.messages) == 1
+
+def test_expired_lease_is_reclaimed(app, inbox, connection):
+    # A dispatcher died mid-send
+    message_id = enqueue("user@example.com", status=service.SENDING, attempts=1, leased_until=datetime.utcnow() - timedelta(seconds=1))
+    live_id = enqueue("other@example.com", status=service.SENDING, attempts=1, leased_until=datetime.utcnow() + timedelta(minutes=5))
+    assert dispatch(connection) == 1
+    assert (load(message_id).status, load(message_id).attempts) == (service.SENT, 2)
+    assert load(live_id).status == service.SENDING
+
+def test_failed_send_is_retried_later(app, monkeypatch, connection):
+    monkeypatch.setattr(settings, "SMTP_PORT", 1)
+    message_id = enqueue("user@example.com")
+    assert dispatch(connection) == 1
+    message = load(message_id)
+    assert (message.status, message.attempts, message.leased_until) == (service.PENDING, 1, None)
+    assert message.next_attempt_at > datetime.utcnow()
+    assert message.last_error
@@ -0,0 +1,42 @@
+import pytest
+from conftest import create_contact
+from src.contacts.pagination import encode_cursor
+
+pytestmark = pytest.mark.anyio
+
+async def create_contacts(client, user, last_names):
+    for n, last_name in enumerate(last_names):
+        await create_contact(client, user, n, last_name=last_name)
+
+async def test_keyset_pages_follow_offset_order(client, user):
+    await create_contacts(client, user, ["Melnyk", "Boyko", "Koval", "Boyko", "Lysenko"])
+    response = await client.get("/contacts/", params={"limit": 10}, headers=user.headers)
+    expected = [(contact["last_name"], contact["id"]) for contact in response.json()]
+    assert [last_name for last_name, _ in expected] == ["Boyko", "Boyko", "Koval", "Lysenko", "Melnyk"]
+
+    seen, params = [], {"limit": 2}
+    while True:
+        response = await client.get("/contacts/", params=params, headers=user.headers)
+        assert response.status_code == 200, response.text
+        seen.extend((contact["last_name"], contact["id"]) for contact in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params = {"limit": 2, "after": response.headers["X-Next-Cursor"]}
+    assert seen == expected
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(["Koval"], 1),
+    encode_cursor("Koval", "1"),
+    encode_cursor(None, 1),
+    encode_cursor("Koval", True),
+    encode_cursor("Koval"),
+    "not-a-cursor",
+])
+async def test_tampered_cursor_is_rejected(client, user, cursor):
+    response = await client.get("/contacts/", params={"after": cursor}, headers=user.headers)
+    assert response.status_code == 400
+
+async def test_tampered_search_cursor_is_rejected(client, user):
+    await create_contacts(client, user, ["Koval"])
+    response = await client.get("/contacts/search/", params={"name": "Ivan", "after": encode_cursor("high", 1)}, headers=user.headers)
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import json
+import time
+from collections import OrderedDict
+import pytest
+from fastapi import HTTPException
+from conftest import contact_payload, create_contact
+from src.config import DEFAULT_RATE_LIMITS, Settings, settings
+from src.utils.rate_limit import RateLimiter, rate_limiter
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """The app's rate limiter, switched on with empty buckets."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "buckets", OrderedDict())
+    monkeypatch.setattr(rate_limiter, "degraded_until", 0.0)
+    monkeypatch.setattr(rate_limiter, "_script", None)
+    return rate_limiter
+
+def test_overrides_are_merged_into_the_default_rules(monkeypatch):
+    monkeypatch.setenv("RATE_LIMITS", json.dumps({"contacts:create": "20/60"}))
+    limiter = RateLimiter(Settings().RATE_LIMITS)
+    assert limiter.rules.keys() == DEFAULT_RATE_LIMITS.keys()
+    assert (limiter.rules["contacts:create"].times, limiter.rules["contacts:create"].seconds) == (20, 60)
+    assert limiter.rules["auth:token:email"].times == 5
+
+async def test_exhausted_bucket_returns_429_with_retry_after(client, user, limiter):
+    # contacts:create allows 5 per 60 seconds
+    for n in range(5):
+        await create_contact(client, user, n)
+    response = await client.post("/contacts/", json=contact_payload(5), headers=user.headers)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 12
+
+async def test_usage_of_other_workers_caps_the_bucket(limiter):
+    async def script(keys, args):
+        # Redis reports the limit as already used up elsewhere
+        return 5
+    limiter._script = script
+    await limiter.hit("contacts:create", "user:1")
+    assert limiter.buckets[("contacts:create", "user:1")].tokens == 0
+    with pytest.raises(HTTPException) as error:
+        await limiter.hit("contacts:create", "user:1")
+    assert error.value.status_code == 429
+
+async def test_redis_down_falls_back_to_local_limits(client, user, limiter, redis_down):
+    for n in range(5):
+        await create_contact(client, user, n)
+    assert limiter.degraded_until > time.monotonic()
+    # The limit still holds, per worker
+    response = await client.post("/contacts/", json=contact_payload(5), headers=user.headers)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
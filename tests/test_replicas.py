@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from src.config import settings
+from src.database import ReplicaRouter
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def make_router(tmp_path, monkeypatch):
+    """Builds ReplicaRouters over SQLite files; a replica named "down" cannot be opened."""
+    monkeypatch.setattr(settings, "DB_REPLICA_STICKY_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "DB_REPLICA_CHECK_SECONDS", 60)
+    routers = []
+
+    def make_router(*names):
+        urls = [
+            f"sqlite:///{tmp_path / 'missing' / 'replica.sqlite3'}" if name == "down" else f"sqlite:///{tmp_path / name}.sqlite3"
+            for name in names
+        ]
+        router = ReplicaRouter(urls)
+        routers.append(router)
+        return router
+
+    yield make_router
+    for router in routers:
+        for replica in router.replicas:
+            replica.engine.dispose()
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+
+def replica_names(replicas) -> list:
+    return [replica and replica.name.rsplit("/", 1)[-1] for replica in replicas]
+
+async def test_reads_go_to_the_primary_without_replicas(make_router, redis):
+    router = make_router()
+    await router.mark_write(1)
+    assert await router.choose(1) is None
+    # Nothing to be sticky for
+    assert await redis.exists("db:sticky:1") == 0
+
+async def test_replicas_are_used_in_round_robin(make_router):
+    router = make_router("a", "b")
+    assert replica_names([await router.choose(1) for _ in range(4)]) == ["a.sqlite3", "b.sqlite3"] * 2
+
+async def test_writer_is_sticky_until_the_window_ends(make_router):
+    router = make_router("a")
+    await router.mark_write(1)
+    assert await router.is_sticky(1)
+    assert await router.choose(1) is None
+    # Other users keep reading from the replica
+    assert await router.choose(2) is router.replicas[0]
+
+    await asyncio.sleep(0.3)
+    assert not await router.is_sticky(1)
+    assert await router.choose(1) is router.replicas[0]
+
+async def test_stickiness_is_shared_between_workers(make_router):
+    writer, reader = make_router("a"), make_router("a")
+    await writer.mark_write(1)
+    assert await reader.is_sticky(1)
+    assert await reader.choose(1) is None
+    await asyncio.sleep(0.3)
+    assert not await reader.is_sticky(1)
+
+async def test_redis_failure_reads_from_the_primary(make_router, redis_down):
+    router = make_router("a")
+    # Unknown stickiness is treated as sticky
+    assert await router.is_sticky(1)
+    assert await router.choose(1) is None
+    # The write still makes this worker's reads sticky
+    await router.mark_write(2)
+    assert router.sticky_until[2] > 0
+
+async def test_unhealthy_replica_is_skipped(make_router):
+    router = make_router("down", "b")
+    assert replica_names([await router.choose(1) for _ in range(3)]) == ["b.sqlite3"] * 3
+    assert router.replicas[0].healthy is False
+
+async def test_all_replicas_down_falls_back_to_the_primary(make_router):
+    router = make_router("down")
+    assert await router.choose(1) is None
+
+async def test_disconnect_fails_over_until_the_next_check(make_router, monkeypatch):
+    router = make_router("a")
+    replica = router.replicas[0]
+    assert await router.choose(1) is replica
+    replica.on_error(SimpleNamespace(is_disconnect=True))
+    assert await router.choose(1) is None
+
+    monkeypatch.setattr(settings, "DB_REPLICA_CHECK_SECONDS", 0)
+    assert await router.choose(1) is replica
@@ -0,0 +1,23 @@
+import pytest
+import run
+from src.config import settings
+
+@pytest.mark.parametrize("cores, workers, configured, expected", [
+    (8, 2, 2, 2),
+    (8, 8, 2, 1),
+    (8, 4, 4, 2),
+    (4, 8, 2, 1),
+])
+def test_bcrypt_pools_share_the_cores(monkeypatch, cores, workers, configured, expected):
+    monkeypatch.setattr(run.os, "cpu_count", lambda: cores)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", configured)
+    assert run.get_worker_hash_pool(workers) == expected
+
+def test_pools_fit_the_connection_budget(monkeypatch):
+    monkeypatch.setattr(settings, "DB_CONNECTION_BUDGET", 90)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", False)
+    pool_size, max_overflow = run.get_worker_pool(4)
+    assert (pool_size, max_overflow) == (20, 2)
+    assert 4 * (pool_size + max_overflow) <= 90
@@ -0,0 +1,80 @@
+import pytest
+from conftest import create_contact
+from sqlalchemy import update
+from src.config import settings
+from src.contacts import search
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    search.ngram_indexes.clear()
+    yield
+    search.ngram_indexes.clear()
+
+async def search_names(client, user, name):
+    response = await client.get("/contacts/search/", params={"name": name}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    return [contact["last_name"] for contact in response.json()]
+
+async def test_index_follows_writes_incrementally(client, user):
+    koval = await create_contact(client, user, 1, first_name="Ivan", last_name="Koval")
+    await create_contact(client, user, 2, first_name="Olena", last_name="Kovalenko")
+    assert sorted(await search_names(client, user, "koval")) == ["Koval", "Kovalenko"]
+    index = search.ngram_indexes[user.id]
+
+    await create_contact(client, user, 3, first_name="Petro", last_name="Kovalchuk")
+    response = await client.patch(f"/contacts/{koval}", json={"last_name": "Melnyk"}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    assert sorted(await search_names(client, user, "koval")) == ["Kovalchuk", "Kovalenko"]
+    assert await search_names(client, user, "melnyk") == ["Melnyk"]
+
+    response = await client.delete(f"/contacts/{koval}", headers=user.headers)
+    assert response.status_code == 200, response.text
+    assert await search_names(client, user, "melnyk") == []
+    # Same index, brought up to date rather than rebuilt
+    assert search.ngram_indexes[user.id] is index
+    assert "melnyk" not in {values[1] for values in index.values.values()}
+
+async def test_ttl_rebuilds_index(client, user, monkeypatch):
+    await create_contact(client, user, 1, first_name="Ivan", last_name="Koval")
+    assert await search_names(client, user, "koval") == ["Koval"]
+    index = search.ngram_indexes[user.id]
+
+    # A write that skips the change feed is only seen after a rebuild
+    from src.database import SessionLocal
+    from src.contacts.models import Contact
+    with SessionLocal() as db:
+        db.execute(update(Contact).where(Contact.user_id == user.id).values(last_name="Boyko"))
+        db.commit()
+    assert await search_names(client, user, "boyko") == []
+    monkeypatch.setattr(settings, "SEARCH_INDEX_TTL_SECONDS", 0)
+    assert await search_names(client, user, "boyko") == ["Boyko"]
+    assert search.ngram_indexes[user.id] is not index
+
+def postgres_functions(db):
+    """similarity() and greatest() on the SQLite test database, so search_postgres can run here."""
+    connection = db.connection().connection.driver_connection
+    connection.create_function("similarity", 2, search.similarity)
+    connection.create_function("greatest", -1, max)
+
+@pytest.mark.parametrize("name, expected", [("o_a", ["Ko_al"]), ("%", ["100%"]), ("\\", ["Back\\slash"]), ("koval", ["Koval"])])
+async def test_postgres_search_matches_wildcards_literally(client, user, name, expected):
+    from src.database import SessionLocal
+    for n, last_name in enumerate(["Koval", "Ko_al", "100%", "Back\\slash"]):
+        await create_contact(client, user, n, first_name="Ivan", last_name=last_name)
+    with SessionLocal() as db:
+        postgres_functions(db)
+        ranked = search.search_postgres(db, user.id, name, None, 20, None)
+    assert [contact.last_name for _, contact in ranked] == expected
+
+def test_index_search_intersects_name_and_email():
+    index = search.NgramIndex([
+        (1, "Ivan", "Koval", "ivan@example.com"),
+        (2, "Ivan", "Kovalenko", "ivan.k@mail.com"),
+        (3, "Olena", "Koval", "olena@example.com"),
+    ], version=1)
+    assert [contact_id for _, contact_id in index.search(name="koval", email="example")] == [1, 3]
+    assert [contact_id for _, contact_id in index.search(email="mail.com")] == [2]
+    assert [contact_id for _, contact_id in index.search(name="ivan", email="olena")] == []
+    assert sorted(contact_id for _, contact_id in index.search()) == [1, 2, 3]
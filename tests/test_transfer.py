@@ -0,0 +1,36 @@
+import csv
+import io
+import pytest
+from src.config import settings
+from src.contacts import schemas, transfer
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def contacts(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    body = "first_name,last_name,email,phone,birthday\n" + "".join(
+        f"Ivan,Koval{n},contact-{n}@example.com,+380671234567,1990-05-17\n" for n in range(5)
+    )
+    response = await client.post("/contacts/import", content=body, headers=user.headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 5
+
+def checked_out(db_mode: str) -> int:
+    from src.database import async_engine, engine
+    pool = async_engine.pool if db_mode == "async" else engine.pool
+    return pool.checkedout()
+
+async def test_export_streams_every_contact(client, user, contacts):
+    response = await client.get("/contacts/export", params={"format": "csv"}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["last_name"] for row in rows] == [f"Koval{n}" for n in range(5)]
+
+async def test_abandoned_export_returns_its_connection(client, user, contacts, db_mode):
+    stream = transfer.export_contacts(user.id, schemas.TransferFormat.ndjson)
+    await stream.__anext__()
+    assert checked_out(db_mode) == 1
+    # What the server does when the client goes away mid-download
+    await stream.aclose()
+    assert checked_out(db_mode) == 0
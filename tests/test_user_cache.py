@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from src.auth.cache import INVALIDATION_CHANNEL, UserCache
+from src.auth.models import User
+
+pytestmark = pytest.mark.anyio
+
+def make_user(**fields) -> User:
+    return User(**{"id": 1, "email": "user@example.com", "username": "user", "is_verified": False, "avatar_url": None, **fields})
+
+async def wait_for(condition, timeout: float = 2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+async def wait_subscribed(redis):
+    async def subscribed():
+        return dict(await redis.pubsub_numsub(INVALIDATION_CHANNEL)).get(INVALIDATION_CHANNEL, 0) > 0
+    await wait_for(subscribed)
+
+async def test_invalidation_reaches_other_workers(app, redis):
+    # Two caches stand in for two workers sharing one Redis
+    writer, reader = UserCache(16, 60, 300), UserCache(16, 60, 300)
+    reader.start()
+    try:
+        await wait_subscribed(redis)
+        await reader.set(make_user(), await reader.generation("user@example.com"))
+        assert (await reader.get("user@example.com")).is_verified is False
+
+        await writer.invalidate("user@example.com")
+        async def dropped():
+            return "user@example.com" not in reader._local
+        await wait_for(dropped)
+        assert await reader.get("user@example.com") is None
+        assert reader.stats["remote_invalidations"] == 1
+    finally:
+        await reader.stop()
+
+async def test_listener_stops_cleanly(redis):
+    cache = UserCache(16, 60, 300)
+    cache.start()
+    await wait_subscribed(redis)
+    await cache.stop()
+    assert cache._listener is None
+
+async def test_set_that_raced_an_invalidation_is_discarded(redis):
+    cache = UserCache(16, 60, 300)
+    generation = await cache.generation("user@example.com")
+    # The user row changes and is invalidated while the stale copy is being loaded
+    await cache.invalidate("user@example.com")
+    await cache.set(make_user(), generation)
+    assert await cache.get("user@example.com") is None
+    assert await redis.get("user:user@example.com") is None
+
+async def test_set_that_raced_another_workers_invalidation_is_discarded(redis):
+    writer, reader = UserCache(16, 60, 300), UserCache(16, 60, 300)
+    generation = await reader.generation("user@example.com")
+    await writer.invalidate("user@example.com")
+    await reader.set(make_user(), generation)
+    assert await redis.get("user:user@example.com") is None
+    assert "user@example.com" not in reader._local
+    assert reader.stats["discarded_sets"] == 1
+
+    await reader.set(make_user(), await reader.generation("user@example.com"))
+    assert (await writer.get("user@example.com")).email == "user@example.com"
+
+async def test_stats_report_remote_invalidations(client):
+    response = await client.get("/healthcheck/user-cache")
+    assert response.status_code == 200, response.text
+    assert {"remote_invalidations", "discarded_sets"} <= response.json().keys()